@@ -0,0 +1,43 @@
+"""add query indexes
+
+Revision ID: 7c9d1e2f3a4b
+Revises: 3b8f2c1d4e5a
+Create Date: 2026-10-18 09:31:05.542871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c9d1e2f3a4b'
+down_revision: Union[str, Sequence[str], None] = '3b8f2c1d4e5a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text('is_active')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Build without locking writes on PostgreSQL; CONCURRENTLY cannot run
+    # inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_showtimes_movie_id_is_active', 'showtimes', ['movie_id', 'is_active'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_showtimes_start_time_end_time', 'showtimes', ['start_time', 'end_time'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_showtimes_active_start_time_id', 'showtimes', ['start_time', 'id'], unique=False, postgresql_where=ACTIVE, sqlite_where=ACTIVE, postgresql_concurrently=True)
+        op.create_index('ix_movies_active_id', 'movies', ['id'], unique=False, postgresql_where=ACTIVE, sqlite_where=ACTIVE, postgresql_concurrently=True)
+        op.create_index('ix_bookings_user_id_booking_time', 'bookings', ['user_id', 'booking_time'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_bookings_showtime_id_status', 'bookings', ['showtime_id', 'status'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_showtime_id_status', table_name='bookings')
+    op.drop_index('ix_bookings_user_id_booking_time', table_name='bookings')
+    op.drop_index('ix_movies_active_id', table_name='movies')
+    op.drop_index('ix_showtimes_active_start_time_id', table_name='showtimes')
+    op.drop_index('ix_showtimes_start_time_end_time', table_name='showtimes')
+    op.drop_index('ix_showtimes_movie_id_is_active', table_name='showtimes')
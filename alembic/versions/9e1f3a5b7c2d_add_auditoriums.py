@@ -0,0 +1,123 @@
+"""add auditoriums
+
+Revision ID: 9e1f3a5b7c2d
+Revises: 7c9d1e2f3a4b
+Create Date: 2026-10-18 11:04:52.730416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e1f3a5b7c2d'
+down_revision: Union[str, Sequence[str], None] = '7c9d1e2f3a4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text('is_active')
+DEFAULT_AUDITORIUM = 'Main Hall'
+
+auditoriums = sa.table(
+    'auditoriums',
+    sa.column('id', sa.Integer()),
+    sa.column('name', sa.String()),
+    sa.column('total_seats', sa.Integer()),
+    sa.column('is_active', sa.Boolean()),
+)
+showtimes = sa.table(
+    'showtimes',
+    sa.column('auditorium_id', sa.Integer()),
+    sa.column('total_seats', sa.Integer()),
+)
+
+# Pairs of active showtimes in one auditorium whose [start, end) ranges meet
+OVERLAPPING_SHOWTIMES = sa.text(
+    'SELECT a.id, b.id FROM showtimes a JOIN showtimes b '
+    'ON a.auditorium_id = b.auditorium_id AND a.id < b.id '
+    'AND a.start_time < b.end_time AND b.start_time < a.end_time '
+    'WHERE a.is_active AND b.is_active ORDER BY a.id, b.id LIMIT 50'
+)
+
+
+def _refuse_overlaps() -> None:
+    # Overlap checks used to be racy and missing from updates, so old data
+    # may hold pairs the constraint below would reject with no context
+    if op.get_context().as_sql:
+        return
+    pairs = op.get_bind().execute(OVERLAPPING_SHOWTIMES).all()
+    if pairs:
+        raise RuntimeError(
+            'Cannot add ex_showtimes_auditorium_no_overlap: these active showtimes '
+            'overlap (showing at most 50 pairs): '
+            + ', '.join(f'{first} and {second}' for first, second in pairs)
+            + '. Deactivate or reschedule one of each pair, then run the upgrade again.'
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('auditoriums',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('total_seats', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_auditoriums_id'), 'auditoriums', ['id'], unique=False)
+
+    # Until now every showtime shared a single screen; move them all into a
+    # default auditorium large enough for the biggest one. A database with
+    # no showtimes yet gets no auditorium.
+    op.execute(auditoriums.insert().from_select(
+        ['name', 'total_seats', 'is_active'],
+        sa.select(
+            sa.literal(DEFAULT_AUDITORIUM),
+            sa.func.max(showtimes.c.total_seats),
+            sa.true()
+        ).having(sa.func.count() > 0)
+    ))
+
+    with op.batch_alter_table('showtimes') as batch_op:
+        batch_op.add_column(sa.Column('auditorium_id', sa.Integer(), nullable=True))
+
+    op.execute(showtimes.update().values(
+        auditorium_id=sa.select(auditoriums.c.id)
+        .where(auditoriums.c.name == DEFAULT_AUDITORIUM)
+        .scalar_subquery()
+    ))
+
+    with op.batch_alter_table('showtimes') as batch_op:
+        batch_op.alter_column('auditorium_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_showtimes_auditorium_id_auditoriums', 'auditoriums', ['auditorium_id'], ['id'])
+        # The overlap check is now per auditorium and no longer needs this one
+        batch_op.drop_index('ix_showtimes_start_time_end_time')
+        batch_op.create_index('ix_showtimes_auditorium_active_start_time', ['auditorium_id', 'start_time'], unique=False, postgresql_where=ACTIVE, sqlite_where=ACTIVE)
+
+    if op.get_context().dialect.name == 'postgresql':
+        _refuse_overlaps()
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+        op.execute(
+            'ALTER TABLE showtimes ADD CONSTRAINT ex_showtimes_auditorium_no_overlap '
+            'EXCLUDE USING gist (auditorium_id WITH =, tstzrange(start_time, end_time) WITH &&) '
+            'WHERE (is_active)'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name == 'postgresql':
+        op.drop_constraint('ex_showtimes_auditorium_no_overlap', 'showtimes')
+
+    with op.batch_alter_table('showtimes') as batch_op:
+        batch_op.drop_index('ix_showtimes_auditorium_active_start_time')
+        batch_op.create_index('ix_showtimes_start_time_end_time', ['start_time', 'end_time'], unique=False)
+        batch_op.drop_constraint('fk_showtimes_auditorium_id_auditoriums', type_='foreignkey')
+        batch_op.drop_column('auditorium_id')
+
+    op.drop_index(op.f('ix_auditoriums_id'), table_name='auditoriums')
+    op.drop_table('auditoriums')
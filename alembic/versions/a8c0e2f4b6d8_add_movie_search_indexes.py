@@ -0,0 +1,44 @@
+"""add movie search indexes
+
+Revision ID: a8c0e2f4b6d8
+Revises: f6b8d0e2a4c5
+Create Date: 2026-10-18 21:03:17.640529
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c0e2f4b6d8'
+down_revision: Union[str, Sequence[str], None] = 'f6b8d0e2a4c5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Full-text and trigram search only exist on PostgreSQL; elsewhere the
+    # API searches an in-memory index instead
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute(
+        "CREATE INDEX ix_movies_search ON movies USING gin (("
+        "setweight(to_tsvector('english', title), 'A') || "
+        "setweight(to_tsvector('english', genre), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')))"
+    )
+    op.execute('CREATE INDEX ix_movies_title_trgm ON movies USING gin (lower(title) gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_movies_title_trgm', table_name='movies')
+    op.drop_index('ix_movies_search', table_name='movies')
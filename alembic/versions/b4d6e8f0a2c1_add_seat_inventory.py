@@ -0,0 +1,42 @@
+"""add seat inventory
+
+Revision ID: b4d6e8f0a2c1
+Revises: 9e1f3a5b7c2d
+Create Date: 2026-10-18 13:21:07.418552
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d6e8f0a2c1'
+down_revision: Union[str, Sequence[str], None] = '9e1f3a5b7c2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+auditoriums = sa.table(
+    'auditoriums',
+    sa.column('seats_per_row', sa.Integer()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('auditoriums', sa.Column('seats_per_row', sa.Integer(), nullable=True))
+    op.execute(auditoriums.update().values(seats_per_row=20))
+    with op.batch_alter_table('auditoriums') as batch_op:
+        batch_op.alter_column('seats_per_row', existing_type=sa.Integer(), nullable=False)
+    # NULL means no seat has been picked yet, so existing showtimes need no backfill
+    op.add_column('showtimes', sa.Column('seat_map', sa.LargeBinary(), nullable=True))
+    op.add_column('bookings', sa.Column('seat_numbers', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('bookings', 'seat_numbers')
+    op.drop_column('showtimes', 'seat_map')
+    with op.batch_alter_table('auditoriums') as batch_op:
+        batch_op.drop_column('seats_per_row')
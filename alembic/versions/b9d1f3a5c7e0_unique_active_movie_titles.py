@@ -0,0 +1,47 @@
+"""unique active movie titles
+
+Revision ID: b9d1f3a5c7e0
+Revises: a8c0e2f4b6d8
+Create Date: 2026-10-18 22:14:52.318406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b9d1f3a5c7e0'
+down_revision: Union[str, Sequence[str], None] = 'a8c0e2f4b6d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# SQLite keeps the original constraint unnamed; batch mode needs a name to drop it
+SQLITE_NAMING = {'uq': 'uq_%(table_name)s_%(column_0_name)s'}
+
+
+def _drop_title_constraint() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        op.drop_constraint('movies_title_key', 'movies', type_='unique')
+    else:
+        with op.batch_alter_table('movies', naming_convention=SQLITE_NAMING) as batch_op:
+            batch_op.drop_constraint('uq_movies_title', type_='unique')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Titles are unique among active movies whatever their case; a
+    # deactivated movie no longer holds on to its title
+    _drop_title_constraint()
+    op.execute('CREATE UNIQUE INDEX uq_movies_active_lower_title ON movies (lower(title)) WHERE is_active')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_movies_active_lower_title', table_name='movies')
+    if op.get_context().dialect.name == 'postgresql':
+        op.create_unique_constraint('movies_title_key', 'movies', ['title'])
+    else:
+        with op.batch_alter_table('movies') as batch_op:
+            batch_op.create_unique_constraint('uq_movies_title', ['title'])
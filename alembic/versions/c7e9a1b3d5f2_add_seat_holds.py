@@ -0,0 +1,33 @@
+"""add seat holds
+
+Revision ID: c7e9a1b3d5f2
+Revises: b4d6e8f0a2c1
+Create Date: 2026-10-18 14:02:33.907215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e9a1b3d5f2'
+down_revision: Union[str, Sequence[str], None] = 'b4d6e8f0a2c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HELD = sa.text("status = 'held'")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('bookings', sa.Column('hold_expires_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_bookings_held_hold_expires_at', 'bookings', ['hold_expires_at'], unique=False, postgresql_where=HELD, sqlite_where=HELD)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_bookings_held_hold_expires_at', table_name='bookings')
+    with op.batch_alter_table('bookings') as batch_op:
+        batch_op.drop_column('hold_expires_at')
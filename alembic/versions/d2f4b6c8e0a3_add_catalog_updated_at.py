@@ -0,0 +1,37 @@
+"""add catalog updated_at
+
+Revision ID: d2f4b6c8e0a3
+Revises: c7e9a1b3d5f2
+Create Date: 2026-10-18 15:12:48.260173
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f4b6c8e0a3'
+down_revision: Union[str, Sequence[str], None] = 'c7e9a1b3d5f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('movies', 'showtimes'):
+        # SQLite cannot add a column with a non-constant default, so backfill
+        # first and attach the default with the NOT NULL
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        op.execute(sa.table(table, sa.column('updated_at')).update().values(updated_at=sa.func.now()))
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('showtimes') as batch_op:
+        batch_op.drop_column('updated_at')
+    with op.batch_alter_table('movies') as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,84 @@
+"""add movie daily sales
+
+Revision ID: f6b8d0e2a4c5
+Revises: e5a7c9b1d3f4
+Create Date: 2026-10-18 19:12:44.208351
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d0e2a4c5'
+down_revision: Union[str, Sequence[str], None] = 'e5a7c9b1d3f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+bookings = sa.table(
+    'bookings',
+    sa.column('showtime_id', sa.Integer()),
+    sa.column('seats', sa.Integer()),
+    sa.column('status', sa.String()),
+    sa.column('hold_expires_at', sa.DateTime(timezone=True)),
+    sa.column('booking_time', sa.DateTime(timezone=True)),
+)
+
+showtimes = sa.table(
+    'showtimes',
+    sa.column('id', sa.Integer()),
+    sa.column('movie_id', sa.Integer()),
+)
+
+movie_daily_sales = sa.table(
+    'movie_daily_sales',
+    sa.column('movie_id', sa.Integer()),
+    sa.column('day', sa.Date()),
+    sa.column('bookings', sa.Integer()),
+    sa.column('tickets', sa.Integer()),
+    sa.column('cancelled_bookings', sa.Integer()),
+    sa.column('cancelled_tickets', sa.Integer()),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('movie_daily_sales',
+    sa.Column('movie_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('bookings', sa.Integer(), nullable=False),
+    sa.Column('tickets', sa.Integer(), nullable=False),
+    sa.Column('cancelled_bookings', sa.Integer(), nullable=False),
+    sa.Column('cancelled_tickets', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['movie_id'], ['movies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('movie_id', 'day')
+    )
+    op.create_index('ix_movie_daily_sales_day', 'movie_daily_sales', ['day'], unique=False)
+
+    # Fill it from the bookings so far; only sales have no hold expiry
+    cancelled = bookings.c.status == 'cancelled'
+    if op.get_context().dialect.name == 'postgresql':
+        day = sa.cast(sa.func.timezone('UTC', bookings.c.booking_time), sa.Date())
+    else:
+        day = sa.func.date(bookings.c.booking_time)
+    op.execute(movie_daily_sales.insert().from_select(
+        ['movie_id', 'day', 'bookings', 'tickets', 'cancelled_bookings', 'cancelled_tickets'],
+        sa.select(
+            showtimes.c.movie_id,
+            day,
+            sa.func.count(),
+            sa.func.sum(bookings.c.seats),
+            sa.func.sum(sa.case((cancelled, 1), else_=0)),
+            sa.func.sum(sa.case((cancelled, bookings.c.seats), else_=0))
+        )
+        .select_from(bookings.join(showtimes, showtimes.c.id == bookings.c.showtime_id))
+        .where(bookings.c.hold_expires_at.is_(None))
+        .group_by(showtimes.c.movie_id, day)
+    ))
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_movie_daily_sales_day', table_name='movie_daily_sales')
+    op.drop_table('movie_daily_sales')
@@ -1,22 +1,53 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app import models, schemas
-from app.database import get_db
+from app.cache import TTLCache
+from app.database import AsyncSessionLocal, get_db
 from app.config import settings
+from app.passwords import verify_password, get_password_hash
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Resolved users keyed by (username, token iat), so authenticated requests
+# skip the users lookup while the entry is fresh
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def invalidate_principal(username: str):
+    principal_cache.discard_where(lambda key: key[0] == username)
+
+@event.listens_for(models.User, "after_update")
+def _user_updated(mapper, connection, target):
+    state = inspect(target)
+    if not any(
+        state.attrs[attr].history.has_changes()
+        for attr in ("username", "is_active", "is_admin", "hashed_password")
+    ):
+        return
+    
+    usernames = {target.username, *state.attrs.username.history.deleted}
+    for username in usernames:
+        invalidate_principal(username)
+    # Evict again once committed, in case a request re-cached the old row
+    # between the flush and the commit
+    state.session.info.setdefault("stale_principals", set()).update(usernames)
+
+@event.listens_for(models.User, "after_delete")
+def _user_deleted(mapper, connection, target):
+    invalidate_principal(target.username)
+
+@event.listens_for(Session, "after_commit")
+def _evict_stale_principals(session):
+    for username in session.info.pop("stale_principals", ()):
+        invalidate_principal(username)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -24,13 +55,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": datetime.now(timezone.utc)})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,12 +76,31 @@ async def get_current_user(
         token_data = schemas.TokenData(username=username)
     except JWTError:
         raise credentials_exception
+    
+    cache_key = (token_data.username, payload.get("iat"))
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
         
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+    user = await db.scalar(select(models.User).filter(models.User.username == token_data.username))
     if user is None:
         raise credentials_exception
+    
+    # Detach so the cached instance is never tied to (or expired by) a session
+    db.expunge(user)
+    principal_cache.set(cache_key, user)
     return user
 
+async def authenticate_token(token: str):
+    """Resolve a bearer token passed outside the Authorization header.
+    
+    Browsers cannot set headers on EventSource or WebSocket connections, so
+    streaming endpoints take the token as a query parameter. The session is
+    closed straight away rather than held for the life of the stream.
+    """
+    async with AsyncSessionLocal() as db:
+        return await get_current_user(token, db)
+
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
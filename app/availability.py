@@ -0,0 +1,127 @@
+"""In-process pub/sub pushing seat availability to live subscribers.
+
+Services call ``availability_hub.notify(showtime_id)`` after committing a
+change to a showtime's seats. Notifications are only collected for
+showtimes somebody watches, and are flushed ``AVAILABILITY_COALESCE_SECONDS``
+after the first one: a burst of bookings costs one query for the fresh
+counts and one message per subscriber, however many bookings it held.
+Subscribers that fall behind only ever see the latest count.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, Optional, Set
+
+from sqlalchemy import select
+
+from app import metrics, models
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class Subscription:
+    def __init__(self, showtime_ids: Set[int]):
+        self.showtime_ids = showtime_ids
+        self._pending: Dict[int, int] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, showtime_id: int, available_seats: int):
+        self._pending[showtime_id] = available_seats
+        self._ready.set()
+
+    async def next(self, timeout: float) -> Dict[int, int]:
+        """Wait for updates; returns {showtime_id: available_seats}, or {} after ``timeout``."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return {}
+        self._ready.clear()
+        updates, self._pending = self._pending, {}
+        return updates
+
+async def load_available_seats(showtime_ids: Iterable[int]) -> Dict[int, int]:
+    async with AsyncSessionLocal() as db:
+        return dict((await db.execute(
+            select(models.Showtime.id, models.Showtime.available_seats)
+            .filter(models.Showtime.id.in_(list(showtime_ids)))
+        )).all())
+
+class AvailabilityHub:
+    def __init__(self, coalesce_seconds: float):
+        self.coalesce_seconds = coalesce_seconds
+        self.notifications = 0
+        self.flushes = 0
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._dirty: Set[int] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscribers(self) -> int:
+        return len({subscription for group in self._subscriptions.values() for subscription in group})
+
+    def notify(self, showtime_id: int):
+        if not self._subscriptions.get(showtime_id):
+            return
+        self.notifications += 1
+        self._dirty.add(showtime_id)
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.coalesce_seconds)
+        # Anything notified from here on schedules the next flush
+        dirty, self._dirty = self._dirty, set()
+        self._flush_task = None
+        
+        watched = [showtime_id for showtime_id in dirty if self._subscriptions.get(showtime_id)]
+        if not watched:
+            return
+        
+        try:
+            available = await load_available_seats(watched)
+        except Exception:
+            logger.exception("Loading seat availability for subscribers failed")
+            return
+        
+        self.flushes += 1
+        for showtime_id, available_seats in available.items():
+            for subscription in self._subscriptions.get(showtime_id, ()):
+                subscription.push(showtime_id, available_seats)
+
+    @asynccontextmanager
+    async def subscribe(self, showtime_ids: Iterable[int]):
+        subscription = Subscription(set(showtime_ids))
+        for showtime_id in subscription.showtime_ids:
+            self._subscriptions[showtime_id].add(subscription)
+        try:
+            yield subscription
+        finally:
+            for showtime_id in subscription.showtime_ids:
+                group = self._subscriptions.get(showtime_id)
+                if group is not None:
+                    group.discard(subscription)
+                    if not group:
+                        del self._subscriptions[showtime_id]
+
+availability_hub = AvailabilityHub(settings.AVAILABILITY_COALESCE_SECONDS)
+
+async def watch(showtime_ids: Set[int], keepalive: float) -> AsyncIterator[Dict[int, int]]:
+    """Yield the current availability, then every change; {} when ``keepalive`` passes quietly."""
+    async with availability_hub.subscribe(showtime_ids) as subscription:
+        # Snapshot only once subscribed, so no change can slip in between
+        updates = await load_available_seats(showtime_ids)
+        while True:
+            yield updates
+            updates = await subscription.next(keepalive)
+
+availability_notifications = metrics.Counter("availability_notifications_total", "Seat changes on watched showtimes, before coalescing.")
+availability_flushes = metrics.Counter("availability_flushes_total", "Coalesced availability pushes to subscribers.")
+availability_subscribers = metrics.Gauge("availability_subscribers", "Live seat availability subscriptions.")
+
+@metrics.on_scrape
+def _availability_stats():
+    availability_notifications.set(availability_hub.notifications)
+    availability_flushes.set(availability_hub.flushes)
+    availability_subscribers.set(availability_hub.subscribers)
@@ -0,0 +1,96 @@
+"""Read-through cache for the movie and showtime catalog.
+
+Entries are keyed by the catalog version, and every admin write bumps the
+version, so stale pages are never served and simply age out of the LRU.
+Set ``CATALOG_CACHE_URL`` to a ``redis://`` URL to share the version and
+the cached pages between workers; otherwise each process keeps its own and
+only sees writes made through it.
+
+Loaded values go through JSON before they are cached or returned, with
+timestamps as UTC "Z" strings like every API response, so a value looks
+the same whether it was just loaded, kept in process or read from Redis.
+"""
+import json
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+import orjson
+
+from app.cache import TTLCache
+from app.config import settings
+
+VERSION_KEY = "catalog:version"
+
+_MISSING = object()
+
+def normalize(value: Any) -> Any:
+    """``value`` as the cache holds it, for patching fresh columns into cached rows."""
+    return orjson.loads(orjson.dumps(value, option=orjson.OPT_UTC_Z))
+
+class CatalogCache:
+    def __init__(self, maxsize: int, ttl: float, url: Optional[str] = None):
+        self.version = 0
+        # When this process last saw the version change (time.monotonic)
+        self.changed_at: Optional[float] = None
+        self._local = TTLCache(maxsize, ttl)
+        self._redis = None
+        if url:
+            try:
+                from redis import asyncio as redis
+            except ImportError as exc:
+                raise RuntimeError("A redis:// CATALOG_CACHE_URL needs the 'redis' package installed") from exc
+            self._redis = redis.from_url(url)
+
+    async def current_version(self) -> int:
+        if self._redis is not None:
+            version = int(await self._redis.get(VERSION_KEY) or 0)
+            if version != self.version:
+                self.version = version
+                self.changed_at = time.monotonic()
+        return self.version
+
+    def _shared_key(self, version: int, key: Hashable) -> str:
+        return f"catalog:{version}:{json.dumps(key, default=str)}"
+
+    async def fetch(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key``, calling ``load`` on a miss."""
+        version = await self.current_version()
+        
+        value = self._local.get((version, key), _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        if self._redis is not None:
+            raw = await self._redis.get(self._shared_key(version, key))
+            if raw is not None:
+                value = orjson.loads(raw)
+                self._local.set((version, key), value)
+                return value
+        
+        raw = orjson.dumps(await load(), option=orjson.OPT_UTC_Z)
+        value = orjson.loads(raw)
+        self._local.set((version, key), value)
+        if self._redis is not None:
+            await self._redis.set(self._shared_key(version, key), raw, ex=int(self._local.ttl))
+        return value
+
+    async def invalidate(self):
+        if self._redis is not None:
+            self.version = await self._redis.incr(VERSION_KEY)
+        else:
+            self.version += 1
+        self.changed_at = time.monotonic()
+        self._local.clear()
+
+    def stats(self) -> dict:
+        return {"version": self.version, **self._local.stats()}
+
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+
+catalog_cache = CatalogCache(
+    settings.CATALOG_CACHE_MAX_ENTRIES,
+    settings.CATALOG_CACHE_TTL_SECONDS,
+    settings.CATALOG_CACHE_URL
+)
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 import os
 
 class Settings(BaseSettings):
@@ -9,12 +10,88 @@ class Settings(BaseSettings):
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL")
-    
+    # Defaults to DATABASE_URL with the asyncpg/aiosqlite driver
+    ASYNC_DATABASE_URL: Optional[str] = os.getenv("ASYNC_DATABASE_URL")
+    # Refuse to start unless the database is migrated to head and matches the models
+    SCHEMA_CHECK_ON_STARTUP: bool = True
+    # Comma-separated read replica URLs; read-only endpoints take turns between the healthy ones
+    DATABASE_REPLICA_URLS: Optional[str] = os.getenv("DATABASE_REPLICA_URLS")
+    REPLICA_HEALTH_CHECK_INTERVAL_SECONDS: float = 5
+    # Replicas further behind the primary are skipped (PostgreSQL only)
+    REPLICA_MAX_LAG_SECONDS: float = 5
+    # Reads stay on the primary this long after a client writes or the catalog changes
+    REPLICA_PIN_SECONDS: float = 10
+    REPLICA_PIN_MAX_CLIENTS: int = 100000
+
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "2e7dfe4b2a8e41f0c48d9b0c3a0d7fa8c7c5a9d8e1b2c3d4f5a6b7c8d9e0f1a2")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # "thread" or "process"
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    
+    # Authenticated principal cache
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000
+    
+    # Token buckets per router group, per signed-in user or else per client IP
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_AUTH_PER_SECOND: float = 1
+    RATE_LIMIT_AUTH_BURST: int = 10
+    RATE_LIMIT_BOOKINGS_PER_SECOND: float = 5
+    RATE_LIMIT_BOOKINGS_BURST: int = 20
+    RATE_LIMIT_CATALOG_PER_SECOND: float = 20
+    RATE_LIMIT_CATALOG_BURST: int = 100
+    RATE_LIMIT_MAX_CLIENTS: int = 100000
+    
+    # Requests run at once, sized to the database pool; the rest queue briefly or get a 503
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_MAX_CONCURRENCY: int = 20
+    ADMISSION_MAX_QUEUE: int = 100
+    ADMISSION_MAX_WAIT_SECONDS: float = 2
+    
+    # Per-request SQL profiling (query counts, N+1 and slow query plans); adds overhead
+    SQL_PROFILER_ENABLED: bool = False
+    SQL_PROFILER_SLOW_QUERY_MS: float = 100
+    # Runs of one statement in a single request that are flagged as N+1
+    SQL_PROFILER_REPEAT_THRESHOLD: int = 5
+    SQL_PROFILER_HISTORY: int = 100
+    
+    # Movie and showtime catalog cache
+    CATALOG_CACHE_TTL_SECONDS: int = 300
+    CATALOG_CACHE_MAX_ENTRIES: int = 1024
+    CATALOG_CACHE_URL: Optional[str] = None  # in process unless a redis:// URL is given
+    # How long browsers may reuse a movie response before revalidating its ETag
+    CATALOG_MAX_AGE_SECONDS: int = 30
+    
+    # Live seat availability push
+    AVAILABILITY_COALESCE_SECONDS: float = 0.05
+    AVAILABILITY_KEEPALIVE_SECONDS: float = 15
+    AVAILABILITY_MAX_SHOWTIMES: int = 100
+    
+    # Group commit for bookings on a showtime with many concurrent buyers
+    BOOKING_SEQUENCER_ENABLED: bool = False
+    # Concurrent bookings of one showtime (per process) that switch it to the queue
+    BOOKING_SEQUENCER_THRESHOLD: int = 8
+    BOOKING_SEQUENCER_MAX_BATCH: int = 256
+    BOOKING_SEQUENCER_IDLE_SECONDS: float = 1.0
+    
+    # Idempotency-Key on booking writes
+    IDEMPOTENCY_TTL_HOURS: int = 24
+    # How long a duplicate waits for the first request before giving up with 409
+    IDEMPOTENCY_WAIT_SECONDS: float = 10
+    IDEMPOTENCY_LOCK_SECONDS: float = 60
+    
+    # Seat holds
+    HOLD_TTL_MINUTES: int = 10
+    HOLD_STORE_URL: Optional[str] = None  # in process unless a redis:// URL is given
+    HOLD_SWEEP_INTERVAL_SECONDS: float = 5
+    HOLD_SWEEP_BATCH_SIZE: int = 500
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
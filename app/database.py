@@ -1,10 +1,34 @@
+import re
+import time
+from typing import Optional
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app import metrics
 from app.config import settings
 
+# Async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver of ``url`` for its asyncio counterpart."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
 SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+ASYNC_SQLALCHEMY_DATABASE_URL = settings.ASYNC_DATABASE_URL or to_async_url(SQLALCHEMY_DATABASE_URL)
 
+# Sync engine for scripts and migrations; the API uses async_engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
     pool_size=20, 
@@ -13,11 +37,54 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Records how long each checkout waited for a free connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_wait.observe(time.perf_counter() - started)
+
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    poolclass=MeteredQueuePool,
+    pool_size=20,
+    max_overflow=0,
+    pool_pre_ping=True
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+# SQLite names only the index, for indexes on expressions
+_SQLITE_UNIQUE_INDEX = re.compile(r"UNIQUE constraint failed: index '([^']+)'")
+
+def violated_constraint(exc: IntegrityError) -> Optional[str]:
+    """Name of the constraint behind ``exc`` when the driver reports it
+    (psycopg2 and asyncpg do, SQLite only for unique expression indexes)."""
+    for error in (exc.orig, getattr(exc.orig, "__cause__", None)):
+        name = getattr(error, "constraint_name", None) or getattr(
+            getattr(error, "diag", None), "constraint_name", None
+        )
+        if name:
+            return name
+    match = _SQLITE_UNIQUE_INDEX.search(str(exc.orig))
+    return match.group(1) if match else None
+
+@metrics.on_scrape
+def _pool_stats():
+    pool = async_engine.pool
+    metrics.db_pool_size.set(pool.size())
+    metrics.db_pool_checked_out.set(pool.checkedout())
+    metrics.db_pool_overflow.set(max(pool.overflow(), 0))
@@ -0,0 +1,161 @@
+"""Expiry tracking for temporary seat holds.
+
+A hold is a booking row with status ``held``: its seats are claimed up front
+with the same short conditional update as a purchase, so no lock is kept on
+the showtime while the customer checks out. The store below only schedules
+when each hold runs out, and ``HoldSweeper`` hands the due ones back to the
+database in batches. The database stays the source of truth, so a store that
+loses its contents is simply refilled from the held rows on startup.
+
+Stores implement ``add``, ``remove``, ``pop_due`` and ``close``. Holds are
+kept in process by default; set ``HOLD_STORE_URL`` to a ``redis://`` URL to
+share them between workers through Redis or any server speaking its
+protocol (needs the ``redis`` package).
+"""
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+class MemoryHoldStore:
+    """Min-heap of expiry times; removed holds are skipped lazily when popped."""
+
+    def __init__(self):
+        self._expires_at: Dict[int, float] = {}
+        self._heap: List[Tuple[float, int]] = []
+
+    def __len__(self):
+        return len(self._expires_at)
+
+    async def add(self, hold_id: int, expires_at: float):
+        self._expires_at[hold_id] = expires_at
+        heapq.heappush(self._heap, (expires_at, hold_id))
+
+    async def remove(self, hold_id: int):
+        self._expires_at.pop(hold_id, None)
+
+    async def pop_due(self, now: float, limit: int) -> List[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            expires_at, hold_id = heapq.heappop(self._heap)
+            if self._expires_at.get(hold_id) == expires_at:
+                del self._expires_at[hold_id]
+                due.append(hold_id)
+        return due
+
+    async def close(self):
+        pass
+
+class RedisHoldStore:
+    """Sorted set of hold ids scored by expiry time."""
+
+    def __init__(self, url: str, key: str = "seat_holds"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("A redis:// HOLD_STORE_URL needs the 'redis' package installed") from exc
+        self.key = key
+        self._redis = redis.from_url(url)
+
+    async def add(self, hold_id: int, expires_at: float):
+        await self._redis.zadd(self.key, {hold_id: expires_at})
+
+    async def remove(self, hold_id: int):
+        await self._redis.zrem(self.key, hold_id)
+
+    async def pop_due(self, now: float, limit: int) -> List[int]:
+        candidates = await self._redis.zrangebyscore(self.key, "-inf", now, start=0, num=limit)
+        if not candidates:
+            return []
+        # Only the sweeper whose ZREM removed an id releases it
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for hold_id in candidates:
+                pipe.zrem(self.key, hold_id)
+            removed = await pipe.execute()
+        return [int(hold_id) for hold_id, won in zip(candidates, removed) if won]
+
+    async def close(self):
+        await self._redis.aclose()
+
+def create_hold_store(url: Optional[str]):
+    if not url:
+        return MemoryHoldStore()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisHoldStore(url)
+    raise ValueError(f"Unsupported hold store URL: {url}")
+
+hold_store = create_hold_store(settings.HOLD_STORE_URL)
+
+class HoldSweeper:
+    """Background task releasing expired holds, at most ``batch_size`` per round."""
+
+    def __init__(
+        self,
+        store,
+        release: Callable[[AsyncSession, List[int]], Awaitable[int]],
+        recover: Callable[[AsyncSession, object], Awaitable[int]],
+        interval: float,
+        batch_size: int
+    ):
+        self.store = store
+        self.release = release
+        self.recover = recover
+        self.interval = interval
+        self.batch_size = batch_size
+        self.released = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        due = await self.store.pop_due(time.time(), self.batch_size)
+        if not due:
+            return 0
+        
+        try:
+            async with AsyncSessionLocal() as db:
+                self.released += await self.release(db, due)
+        except Exception:
+            # Put them back so the next round retries them
+            now = time.time()
+            for hold_id in due:
+                await self.store.add(hold_id, now)
+            raise
+        return len(due)
+
+    async def _run(self):
+        try:
+            async with AsyncSessionLocal() as db:
+                await self.recover(db, self.store)
+        except Exception:
+            logger.exception("Restoring seat holds from the database failed")
+        
+        while True:
+            try:
+                swept = await self.sweep()
+            except Exception:
+                logger.exception("Releasing expired seat holds failed")
+                swept = 0
+            # A full batch means more may be due already
+            if swept < self.batch_size:
+                await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.store.close()
@@ -0,0 +1,45 @@
+"""Conditional GET support for the catalog endpoints.
+
+ETags are hashed from each row's id and ``updated_at`` (plus any live
+fields such as ``available_seats``), which the cached pages already carry,
+so answering an unchanged poll with 304 needs no serialization at all.
+"""
+import hashlib
+from datetime import datetime
+from typing import Iterable, Optional
+
+from fastapi import Request, Response, status
+
+def _token(value) -> str:
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def catalog_etag(rows: Iterable[dict], *extra, fields=("id", "updated_at")) -> str:
+    digest = hashlib.sha1()
+    for row in rows:
+        digest.update("\x1f".join(_token(row[field]) for field in fields).encode())
+        digest.update(b"\x1e")
+    digest.update("\x1f".join(_token(value) for value in extra).encode())
+    return f'"{digest.hexdigest()}"'
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so ignore any W/ prefix
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+def conditional(request: Request, response: Response, etag: str, max_age: Optional[int] = None):
+    """Tag ``response`` and return a bare 304 if the client already has this version.
+    
+    ``max_age`` of None means clients must revalidate on every use.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache" if max_age is None else f"private, max-age={max_age}"
+    # Admins see inactive rows, so the representation depends on the caller
+    response.headers["Vary"] = "Authorization"
+    
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=dict(response.headers))
+    return None
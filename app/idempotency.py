@@ -0,0 +1,188 @@
+"""Idempotency-Key support for booking writes.
+
+Clients retry booking and cancellation requests on timeouts. When they send
+an ``Idempotency-Key`` header, the first response (success or 4xx) is kept
+in ``idempotency_keys`` for ``IDEMPOTENCY_TTL_HOURS``. A replay of the key
+gets that response back, marked ``Idempotent-Replayed: true``, from a single
+primary key lookup that never touches the showtime. A duplicate arriving
+while the first request is still running waits for it rather than running
+again.
+
+Keys are scoped to the user and tied to the request they were first used
+with. Reusing one for a different request is rejected with 422.
+
+Claims and stored responses go through the request's own session, committed
+around the endpoint's work, so a keyed request never needs a second pooled
+connection.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.config import settings
+from app.serialization import FastJSONResponse
+
+IDEMPOTENT_REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Expired keys are purged by every this many claims, rather than by a timer
+PURGE_EVERY = 1000
+
+# Requests running in this process, so local duplicates need not poll
+_in_flight: Dict[Tuple[int, str], asyncio.Event] = {}
+_claims = 0
+
+def fingerprint(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+async def _claim(db: AsyncSession, user_id: int, key: str, digest: str) -> Optional[models.IdempotencyKey]:
+    """Mark ``key`` as in flight for us; returns the stored row instead if it is taken."""
+    global _claims
+    now = datetime.now(timezone.utc)
+    claim = {
+        "fingerprint": digest,
+        "status_code": None,
+        "response": None,
+        "locked_until": now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+        "expires_at": now + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS),
+    }
+    
+    _claims += 1
+    if _claims % PURGE_EVERY == 0:
+        await db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.expires_at < now))
+        await db.commit()
+    
+    while True:
+        try:
+            # A Core insert, as a polled row of this key may sit in the session
+            await db.execute(insert(models.IdempotencyKey).values(user_id=user_id, key=key, **claim))
+            await db.commit()
+            return None
+        except IntegrityError:
+            await db.rollback()
+        
+        # Take over a key that expired, or whose first request died mid-way
+        taken_over = await db.execute(
+            update(models.IdempotencyKey)
+            .where(
+                models.IdempotencyKey.user_id == user_id,
+                models.IdempotencyKey.key == key,
+                or_(
+                    models.IdempotencyKey.expires_at < now,
+                    (models.IdempotencyKey.status_code == None) & (models.IdempotencyKey.locked_until < now)
+                )
+            )
+            .values(**claim)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        if taken_over.rowcount == 1:
+            return None
+        
+        # Committing does not expire it, and polling needs the row as stored now
+        stored = await db.get(models.IdempotencyKey, (user_id, key), populate_existing=True)
+        if stored is not None:
+            return stored
+
+async def _store(db: AsyncSession, user_id: int, key: str, status_code: int, content: Any):
+    await db.execute(
+        update(models.IdempotencyKey)
+        .where(models.IdempotencyKey.user_id == user_id, models.IdempotencyKey.key == key)
+        .values(status_code=status_code, response=content)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def _release(db: AsyncSession, user_id: int, key: str):
+    # Only drops a claim that never got a response, so a retry can run afresh
+    await db.execute(
+        delete(models.IdempotencyKey)
+        .where(
+            models.IdempotencyKey.user_id == user_id,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.status_code == None
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+async def _wait(user_id: int, key: str, deadline: float):
+    loop = asyncio.get_running_loop()
+    remaining = deadline - loop.time()
+    if remaining <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still in progress"
+        )
+    
+    event = _in_flight.get((user_id, key))
+    if event is None:
+        # Running in another process: poll the stored row
+        await asyncio.sleep(min(0.1, remaining))
+        return
+    try:
+        await asyncio.wait_for(event.wait(), remaining)
+    except asyncio.TimeoutError:
+        pass
+
+async def idempotent(
+    db: AsyncSession,
+    user_id: int,
+    key: str,
+    digest: str,
+    run: Callable[[], Awaitable[Any]],
+    schema: Optional[Type[BaseModel]] = None
+) -> FastJSONResponse:
+    """Run ``run`` once per (user, key) and answer replays with its stored response.
+    
+    ``db`` is the request's session, the one ``run`` works in. ``digest`` identifies the request (see ``fingerprint``); ``schema`` is
+    the endpoint's response model, used to encode the result for storage.
+    """
+    deadline = asyncio.get_running_loop().time() + settings.IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        stored = await _claim(db, user_id, key, digest)
+        if stored is None:
+            break
+        if stored.fingerprint != digest:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used for a different request"
+            )
+        if stored.status_code is not None:
+            return FastJSONResponse(
+                stored.response,
+                status_code=stored.status_code,
+                headers={IDEMPOTENT_REPLAYED_HEADER: "true"}
+            )
+        await _wait(user_id, key, deadline)
+    
+    done = _in_flight[(user_id, key)] = asyncio.Event()
+    try:
+        try:
+            result = await run()
+        except HTTPException as exc:
+            # Client errors are answers too; server errors may be retried
+            if exc.status_code < 500:
+                # Whatever the endpoint left uncommitted goes with the error
+                await db.rollback()
+                await _store(db, user_id, key, exc.status_code, {"detail": exc.detail})
+            raise
+        
+        content = schema.model_validate(result).model_dump(mode="json") if schema else jsonable_encoder(result)
+        await _store(db, user_id, key, status.HTTP_200_OK, content)
+        return FastJSONResponse(content)
+    except BaseException:
+        await db.rollback()
+        await _release(db, user_id, key)
+        raise
+    finally:
+        del _in_flight[(user_id, key)]
+        done.set()
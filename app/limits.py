@@ -0,0 +1,173 @@
+"""Rate limiting and admission control in front of the routers.
+
+Each router group (auth, bookings, catalog) gets a ``RateLimiter``: a token
+bucket per signed-in user, or per client IP for anonymous callers, refilled
+at ``per_second`` up to ``burst``. A client over its budget gets a 429 with
+``Retry-After`` set to when its next token arrives.
+
+Behind that, ``admission`` caps how many requests run at once to what the
+database pool can serve. A few more may queue briefly. Anything beyond that
+is shed with a 503 straight away, instead of waiting for a connection until
+it times out and slowing every other endpoint down. Streaming connections
+are not counted: they hold no connection while they wait.
+"""
+import asyncio
+import math
+import time
+from typing import Dict
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+from starlette.requests import HTTPConnection
+
+from app import metrics
+from app.cache import TTLCache
+from app.config import settings
+
+def client_key(connection: HTTPConnection) -> str:
+    # Only the signature is checked, so this costs no database round trip;
+    # an invalid token is limited by IP and then rejected by the endpoint
+    scheme, _, token = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        except JWTError:
+            payload = {}
+        if payload.get("sub"):
+            return f"user:{payload['sub']}"
+    return f"ip:{connection.client.host if connection.client else 'unknown'}"
+
+class RateLimiter:
+    """Token bucket per client, kept in an LRU so idle clients are forgotten.
+
+    A bucket left alone for ``burst / per_second`` seconds is full again, so
+    that is its TTL: dropping it then is the same as keeping it.
+    """
+
+    def __init__(self, name: str, per_second: float, burst: int, max_clients: int):
+        self.name = name
+        self.per_second = per_second
+        self.burst = burst
+        self.allowed = 0
+        self.rejected = 0
+        self._buckets = TTLCache(maxsize=max_clients, ttl=burst / per_second)
+
+    def take(self, key: str) -> float:
+        """Spend a token for ``key``; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.per_second)
+        if tokens < 1:
+            self._buckets.set(key, (tokens, now))
+            return (1 - tokens) / self.per_second
+        
+        self._buckets.set(key, (tokens - 1, now))
+        return 0
+
+    async def __call__(self, connection: HTTPConnection):
+        if not settings.RATE_LIMIT_ENABLED or connection.scope["type"] != "http":
+            return
+        
+        retry_after = self.take(client_key(connection))
+        if retry_after:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )
+        self.allowed += 1
+
+    def stats(self) -> dict:
+        return {
+            "per_second": self.per_second,
+            "burst": self.burst,
+            "clients": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+        }
+
+class AdmissionController:
+    """Caps requests in flight; ``max_queue`` more may wait up to ``max_wait`` seconds."""
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_wait: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.timed_out = 0
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def _busy(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    async def __call__(self, connection: HTTPConnection):
+        if not settings.ADMISSION_CONTROL_ENABLED or connection.scope["type"] != "http":
+            yield
+            return
+        
+        # Only touched from the event loop, so plain counters are enough
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            self.shed += 1
+            raise self._busy()
+        
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise self._busy()
+        finally:
+            self.waiting -= 1
+        
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+    
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+        }
+
+rate_limiters: Dict[str, RateLimiter] = {
+    name: RateLimiter(
+        name,
+        per_second=getattr(settings, f"RATE_LIMIT_{name.upper()}_PER_SECOND"),
+        burst=getattr(settings, f"RATE_LIMIT_{name.upper()}_BURST"),
+        max_clients=settings.RATE_LIMIT_MAX_CLIENTS
+    )
+    for name in ("auth", "bookings", "catalog")
+}
+
+admission = AdmissionController(
+    max_concurrency=settings.ADMISSION_MAX_CONCURRENCY,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_wait=settings.ADMISSION_MAX_WAIT_SECONDS
+)
+
+rate_limit_rejections = metrics.Counter("rate_limit_rejected_total", "Requests refused with 429.", ("group",))
+admission_rejections = metrics.Counter("admission_rejected_total", "Requests refused with 503.", ("reason",))
+
+@metrics.on_scrape
+def _limit_stats():
+    for name, limiter in rate_limiters.items():
+        rate_limit_rejections.set(limiter.rejected, name)
+    admission_rejections.set(admission.shed, "queue_full")
+    admission_rejections.set(admission.timed_out, "wait_timeout")
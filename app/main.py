@@ -1,16 +1,50 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
+from app import metrics, models
+from app.auth import get_current_admin_user
+from app.catalog import catalog_cache
 from app.config import settings
-from app.database import engine, Base
-from app.routes import auth, bookings, movies, showtime
+from app.database import AsyncSessionLocal, async_engine
+from app.holds import HoldSweeper, hold_store
+from app.idempotency import IDEMPOTENT_REPLAYED_HEADER
+from app.limits import admission, rate_limiters
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER
+from app.passwords import password_hasher
+from app.profiler import SQL_PROFILE_HEADER, SQLProfilerMiddleware, sql_profiler
+from app.replicas import ReplicaPinMiddleware, replica_router
+from app.routes import analytics, auditoriums, auth, bookings, movies, showtime
+from app.schema import check_schema
+from app.search import movie_search_index
+from app.services.booking_service import booking_sequencer, recover_holds, release_expired_holds
+
+hold_sweeper = HoldSweeper(
+    hold_store,
+    release_expired_holds,
+    recover_holds,
+    interval=settings.HOLD_SWEEP_INTERVAL_SECONDS,
+    batch_size=settings.HOLD_SWEEP_BATCH_SIZE
+)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    if settings.SCHEMA_CHECK_ON_STARTUP:
+        async with async_engine.connect() as conn:
+            await conn.run_sync(check_schema)
+    if async_engine.dialect.name != "postgresql":
+        # Build the in-memory search index now rather than on the first search
+        async with AsyncSessionLocal() as db:
+            await movie_search_index.refresh(db, await catalog_cache.current_version())
+    hold_sweeper.start()
+    replica_router.start()
     yield
-    engine.dispose()
+    await replica_router.stop()
+    await hold_sweeper.stop()
+    await booking_sequencer.stop()
+    await catalog_cache.close()
+    await async_engine.dispose()
+    password_hasher.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -24,13 +58,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER, "ETag", IDEMPOTENT_REPLAYED_HEADER, SQL_PROFILE_HEADER],
 )
+if settings.SQL_PROFILER_ENABLED:
+    sql_profiler.install(async_engine)
+    app.add_middleware(SQLProfilerMiddleware, profiler=sql_profiler)
+if replica_router.replicas:
+    app.add_middleware(ReplicaPinMiddleware, router=replica_router)
+app.add_middleware(metrics.MetricsMiddleware)
 
-app.include_router(auth.router, prefix=settings.API_V1_STR)
-app.include_router(movies.router, prefix=settings.API_V1_STR)
-app.include_router(showtime.router, prefix=settings.API_V1_STR)
-app.include_router(bookings.router, prefix=settings.API_V1_STR)
+def limited(group: str):
+    # Cheap per-client rejection first, then a slot from the shared budget
+    return [Depends(rate_limiters[group]), Depends(admission)]
+
+app.include_router(auth.router, prefix=settings.API_V1_STR, dependencies=limited("auth"))
+app.include_router(movies.router, prefix=settings.API_V1_STR, dependencies=limited("catalog"))
+app.include_router(auditoriums.router, prefix=settings.API_V1_STR, dependencies=limited("catalog"))
+app.include_router(showtime.router, prefix=settings.API_V1_STR, dependencies=limited("catalog"))
+app.include_router(bookings.router, prefix=settings.API_V1_STR, dependencies=limited("bookings"))
+app.include_router(analytics.router, prefix=settings.API_V1_STR, dependencies=limited("catalog"))
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to Movie Ticket Booking System"}
\ No newline at end of file
+    return {"message": "Welcome to Movie Ticket Booking System"}
+
+@app.get(f"{settings.API_V1_STR}/admission")
+async def admission_stats(current_user: models.User = Depends(get_current_admin_user)):
+    return {
+        "admission": admission.stats(),
+        "rate_limits": {name: limiter.stats() for name, limiter in rate_limiters.items()},
+        "booking_sequencer": booking_sequencer.stats(),
+    }
+
+@app.get(f"{settings.API_V1_STR}/sql-profile")
+async def sql_profile_summary(current_user: models.User = Depends(get_current_admin_user)):
+    return sql_profiler.summary()
+
+@app.get(f"{settings.API_V1_STR}/catalog-cache")
+async def catalog_cache_stats(current_user: models.User = Depends(get_current_admin_user)):
+    return catalog_cache.stats()
+
+@app.get(f"{settings.API_V1_STR}/replicas")
+async def replica_stats(current_user: models.User = Depends(get_current_admin_user)):
+    return replica_router.stats()
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
\ No newline at end of file
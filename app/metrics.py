@@ -0,0 +1,185 @@
+"""Process metrics in the Prometheus text format, served at ``/metrics``.
+
+Kept deliberately small rather than pulling in a client library. Everything
+is updated from the event loop thread, so an update is a dict lookup and an
+add with no locking. Histograms keep one count per bucket and sum them only
+when scraped. Values that other components already count (pool, admission,
+rate limits) are copied in by ``on_scrape`` hooks instead of on every
+request.
+"""
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from fastapi import HTTPException
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; covers a cache hit up to a request queued behind the pool
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_metrics: List["_Metric"] = []
+_scrape_hooks: List[Callable[[], None]] = []
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        _metrics.append(self)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, value: float, *labels):
+        """Mirror a total counted elsewhere."""
+        self._values[labels] = value
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels):
+        series = self._values.get(labels)
+        if series is None:
+            # Per-bucket counts plus the +Inf bucket, then the sum
+            series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        label_names = self.labels + ("le",)
+        for key, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(label_names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+def on_scrape(hook: Callable[[], None]):
+    _scrape_hooks.append(hook)
+    return hook
+
+def render() -> str:
+    for hook in _scrape_hooks:
+        hook()
+    return "\n".join(metric.render() for metric in _metrics) + "\n"
+
+http_requests = Counter("http_requests_total", "HTTP requests answered.", ("method", "route", "status"))
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "Time to answer an HTTP request.", ("method", "route")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being answered.", ("method",))
+
+service_calls = Counter("service_calls_total", "Service function calls.", ("function", "outcome"))
+service_duration = Histogram("service_duration_seconds", "Service function run time.", ("function",))
+
+bookings = Counter("bookings_total", "Booking attempts by outcome.", ("kind", "outcome"))
+
+db_pool_size = Gauge("db_pool_size", "Connections the database pool keeps open.")
+db_pool_checked_out = Gauge("db_pool_checked_out", "Database connections in use.")
+db_pool_overflow = Gauge("db_pool_overflow", "Database connections open beyond the pool size.")
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a database connection."
+)
+
+def timed(fn):
+    """Count calls of a service coroutine and how long they take."""
+    name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await fn(*args, **kwargs)
+            outcome = "ok"
+            return result
+        except HTTPException as exc:
+            if exc.status_code < 500:
+                outcome = "rejected"
+            raise
+        finally:
+            service_duration.observe(time.perf_counter() - started, name)
+            service_calls.inc(name, outcome)
+
+    return wrapper
+
+class MetricsMiddleware:
+    """Times every HTTP request under its route template, e.g. ``/api/v1/showtimes/{showtime_id}``."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Set by the router once matched; templates keep the label set small
+            route = scope.get("route")
+            template = route.path if route is not None else "unmatched"
+            http_requests_in_flight.dec(method)
+            http_request_duration.observe(time.perf_counter() - started, method, template)
+            http_requests.inc(method, template, status_code)
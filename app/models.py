@@ -1,8 +1,13 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Text
+from datetime import datetime, timezone
+from sqlalchemy import DDL, JSON, Boolean, Column, Date, ForeignKey, Index, Integer, LargeBinary, String, DateTime, Text, event
+from sqlalchemy.dialects.postgresql import ExcludeConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
 
+def _utcnow():
+    return datetime.now(timezone.utc)
+
 class User(Base):
     __tablename__ = "users"
     
@@ -21,29 +26,106 @@ class Movie(Base):
     __tablename__ = "movies"
     
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String(100), nullable=False, unique=True)
+    # Unique among active movies whatever the case, see uq_movies_active_lower_title
+    title = Column(String(100), nullable=False)
     description = Column(Text)
     duration = Column(Integer, nullable=False)
     genre = Column(String(50), nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set in Python rather than by the server so the ORM knows the new value
+    # without a reload, at full precision on every backend (feeds ETags)
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, onupdate=_utcnow, server_default=func.now())
     
     showtimes = relationship("Showtime", back_populates="movie", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Catalog listing of active movies, paged by id
+        Index("ix_movies_active_id", "id", postgresql_where=is_active, sqlite_where=is_active),
+    )
+
+# Search document and indexes for movies on PostgreSQL (see app.search), and
+# case-insensitive title uniqueness everywhere. Written as DDL rather than
+# Index() because autogenerate cannot compare expressions over varchar
+# columns; app.schema leaves them out of its check.
+MOVIE_SEARCH_DOCUMENT = (
+    "setweight(to_tsvector('english', title), 'A') || "
+    "setweight(to_tsvector('english', genre), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+MOVIE_TITLE_UNIQUE = "uq_movies_active_lower_title"
+
+DDL_INDEXES = {
+    "ix_movies_search": DDL(
+        f"CREATE INDEX ix_movies_search ON movies USING gin (({MOVIE_SEARCH_DOCUMENT}))"
+    ).execute_if(dialect="postgresql"),
+    # Needs the pg_trgm extension
+    "ix_movies_title_trgm": DDL(
+        "CREATE INDEX ix_movies_title_trgm ON movies USING gin (lower(title) gin_trgm_ops)"
+    ).execute_if(dialect="postgresql"),
+    MOVIE_TITLE_UNIQUE: DDL(
+        f"CREATE UNIQUE INDEX {MOVIE_TITLE_UNIQUE} ON movies (lower(title)) WHERE is_active"
+    ),
+}
+
+for ddl in DDL_INDEXES.values():
+    event.listen(Movie.__table__, "after_create", ddl)
+
+class Auditorium(Base):
+    __tablename__ = "auditoriums"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), unique=True, nullable=False)
+    total_seats = Column(Integer, nullable=False)
+    seats_per_row = Column(Integer, nullable=False, default=20)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    showtimes = relationship("Showtime", back_populates="auditorium")
 
 class Showtime(Base):
     __tablename__ = "showtimes"
     
     id = Column(Integer, primary_key=True, index=True)
     movie_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
+    auditorium_id = Column(Integer, ForeignKey("auditoriums.id"), nullable=False)
     start_time = Column(DateTime(timezone=True), nullable=False)
     end_time = Column(DateTime(timezone=True), nullable=False)
     total_seats = Column(Integer, nullable=False)
     available_seats = Column(Integer, nullable=False)
+    # One bit per seat, set when taken (see app.seatmap); NULL means none taken
+    seat_map = Column(LargeBinary)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), nullable=False, default=_utcnow, onupdate=_utcnow, server_default=func.now())
     
     movie = relationship("Movie", back_populates="showtimes")
+    auditorium = relationship("Auditorium", back_populates="showtimes")
     bookings = relationship("Booking", back_populates="showtime")
+    
+    __table_args__ = (
+        Index("ix_showtimes_movie_id_is_active", "movie_id", "is_active"),
+        # Overlap check when scheduling: latest active showtime in an
+        # auditorium starting before a given time
+        Index(
+            "ix_showtimes_auditorium_active_start_time", "auditorium_id", "start_time",
+            postgresql_where=is_active, sqlite_where=is_active
+        ),
+        # PostgreSQL also rejects overlapping active showtimes in one auditorium
+        ExcludeConstraint(
+            (auditorium_id, "="),
+            (func.tstzrange(start_time, end_time), "&&"),
+            name="ex_showtimes_auditorium_no_overlap",
+            using="gist",
+            where=is_active
+        ).ddl_if(dialect="postgresql"),
+        # Catalog listing of active showtimes, paged by (start_time, id)
+        Index(
+            "ix_showtimes_active_start_time_id", "start_time", "id",
+            postgresql_where=is_active, sqlite_where=is_active
+        ),
+    )
 
 class Booking(Base):
     __tablename__ = "bookings"
@@ -52,8 +134,55 @@ class Booking(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     showtime_id = Column(Integer, ForeignKey("showtimes.id"), nullable=False)
     seats = Column(Integer, nullable=False)
+    # Seat indices picked by the customer; NULL for unassigned seating
+    seat_numbers = Column(JSON)
+    # completed, cancelled, or held until hold_expires_at and then expired
     status = Column(String(20), default="completed")
+    hold_expires_at = Column(DateTime(timezone=True))
     booking_time = Column(DateTime(timezone=True), server_default=func.now())
     
     user = relationship("User", back_populates="bookings")
-    showtime = relationship("Showtime", back_populates="bookings")
\ No newline at end of file
+    showtime = relationship("Showtime", back_populates="bookings")
+    
+    __table_args__ = (
+        Index("ix_bookings_user_id_booking_time", "user_id", "booking_time"),
+        Index("ix_bookings_showtime_id_status", "showtime_id", "status"),
+        Index(
+            "ix_bookings_held_hold_expires_at",
+            "hold_expires_at",
+            postgresql_where=status == "held",
+            sqlite_where=status == "held"
+        ),
+    )
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # sha256 of the request the key was first used with
+    fingerprint = Column(String(64), nullable=False)
+    # Both NULL while the first request is still running
+    status_code = Column(Integer)
+    response = Column(JSON)
+    # A request still running past this is presumed dead and may be retried
+    locked_until = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+# Bookings per movie and booking day (UTC), kept current by the booking
+# service. Purchases count, holds only once confirmed; a cancelled booking
+# stays counted on the day it was made and adds to the cancelled columns.
+class MovieDailySales(Base):
+    __tablename__ = "movie_daily_sales"
+    
+    movie_id = Column(Integer, ForeignKey("movies.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    bookings = Column(Integer, nullable=False, default=0)
+    tickets = Column(Integer, nullable=False, default=0)
+    cancelled_bookings = Column(Integer, nullable=False, default=0)
+    cancelled_tickets = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Dashboards over a date range across all movies
+        Index("ix_movie_daily_sales_day", "day"),
+    )
\ No newline at end of file
@@ -0,0 +1,61 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Hard cap on any page size a client can ask for
+MAX_PAGE_SIZE = 100
+DEFAULT_PAGE_SIZE = 50
+
+# Response header carrying the cursor for the next page, absent on the last one
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Pack the sort key of the last row on a page into an opaque token."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Unpack a token from :func:`encode_cursor`, checking it against ``types``."""
+    invalid_cursor = HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid pagination cursor"
+    )
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise invalid_cursor
+        return [
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for value, type_ in zip(payload, types)
+        ]
+    except (ValueError, TypeError):
+        raise invalid_cursor
+
+# Response header carrying the approximate number of rows across all pages
+TOTAL_ESTIMATE_HEADER = "X-Total-Count-Estimate"
+
+# Rows counted at most when the database offers no planner estimate
+ESTIMATE_COUNT_CAP = 10000
+
+async def estimate_count(db: AsyncSession, query: Select) -> int:
+    """Approximate the number of rows ``query`` returns without a full COUNT(*).
+    
+    PostgreSQL answers from the planner's row estimate; other databases count
+    at most ``ESTIMATE_COUNT_CAP`` rows.
+    """
+    if db.bind.dialect.name == "postgresql":
+        statement = query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+        connection = await db.connection()
+        plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+    
+    capped = query.limit(ESTIMATE_COUNT_CAP).subquery()
+    return await db.scalar(select(func.count()).select_from(capped))
@@ -0,0 +1,197 @@
+"""Opt-in SQL profiling per HTTP request.
+
+With ``SQL_PROFILER_ENABLED`` the async engine's cursor events count every
+statement a request runs and the time spent in the database. The totals go
+back in an ``X-SQL-Profile`` header and are aggregated per route template
+for ``GET /api/v1/sql-profile``.
+
+A statement repeated ``SQL_PROFILER_REPEAT_THRESHOLD`` times within one
+request is flagged as a likely N+1 (one query per row of an earlier one).
+Statements slower than ``SQL_PROFILER_SLOW_QUERY_MS`` are logged with their
+``EXPLAIN`` plan. The plan is fetched on a separate connection once the
+request is done, so it never adds to that request's own latency.
+
+Off by default. When disabled nothing is hooked, so it costs nothing.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+SQL_PROFILE_HEADER = "X-SQL-Profile"
+
+# Repeated statements listed per route in the summary
+TOP_REPEATED = 5
+
+class RequestProfile:
+    __slots__ = ("queries", "db_seconds", "statements", "slow")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Counter = Counter()
+        self.slow: List[tuple] = []
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        return {statement: count for statement, count in self.statements.items() if count >= threshold}
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+
+class SQLProfiler:
+    def __init__(self, slow_query_ms: float, repeat_threshold: int, history: int):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.repeat_threshold = repeat_threshold
+        self.routes: Dict[str, dict] = {}
+        self.slow_queries: Deque[dict] = deque(maxlen=history)
+        self._engine: Optional[AsyncEngine] = None
+        self._explaining: Set[asyncio.Task] = set()
+
+    def install(self, engine: AsyncEngine):
+        self._engine = engine
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            context._profiler_started = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        started = getattr(context, "_profiler_started", None)
+        if profile is None or started is None:
+            return
+        
+        elapsed = time.perf_counter() - started
+        profile.queries += 1
+        profile.db_seconds += elapsed
+        profile.statements[statement] += 1
+        if elapsed >= self.slow_query_seconds:
+            profile.slow.append((statement, None if executemany else parameters, elapsed))
+
+    def header(self, profile: RequestProfile) -> str:
+        return (
+            f"queries={profile.queries}, db_ms={profile.db_seconds * 1000:.2f}, "
+            f"repeated={len(profile.repeated(self.repeat_threshold))}"
+        )
+
+    def record(self, method: str, route: str, profile: RequestProfile):
+        stats = self.routes.get(f"{method} {route}")
+        if stats is None:
+            stats = self.routes[f"{method} {route}"] = {
+                "requests": 0,
+                "queries": 0,
+                "db_seconds": 0.0,
+                "max_queries": 0,
+                "requests_with_repeats": 0,
+                "slow_queries": 0,
+                "repeated": Counter(),
+            }
+        
+        repeated = profile.repeated(self.repeat_threshold)
+        stats["requests"] += 1
+        stats["queries"] += profile.queries
+        stats["db_seconds"] += profile.db_seconds
+        stats["max_queries"] = max(stats["max_queries"], profile.queries)
+        stats["slow_queries"] += len(profile.slow)
+        if repeated:
+            stats["requests_with_repeats"] += 1
+            stats["repeated"].update(repeated.keys())
+        
+        for statement, parameters, elapsed in profile.slow:
+            task = asyncio.get_running_loop().create_task(
+                self._explain(method, route, statement, parameters, elapsed)
+            )
+            self._explaining.add(task)
+            task.add_done_callback(self._explaining.discard)
+
+    async def _explain(self, method: str, route: str, statement: str, parameters, elapsed: float):
+        plan = None
+        # Batched (executemany) statements have no single set of parameters
+        if parameters is not None:
+            sqlite = self._engine.dialect.name == "sqlite"
+            try:
+                async with self._engine.connect() as conn:
+                    rows = (await conn.exec_driver_sql(
+                        ("EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN ") + statement, parameters
+                    )).all()
+                plan = "\n".join(str(row[-1]) for row in rows)
+            except Exception:
+                logger.exception("Could not explain slow query")
+        
+        logger.warning(
+            "Slow query (%.1f ms) in %s %s:\n%s\n%s",
+            elapsed * 1000, method, route, statement, plan or "(no plan)"
+        )
+        self.slow_queries.append({
+            "route": f"{method} {route}",
+            "ms": round(elapsed * 1000, 2),
+            "statement": statement,
+            "plan": plan,
+        })
+
+    def summary(self) -> dict:
+        routes = {}
+        for route, stats in sorted(self.routes.items(), key=lambda item: -item[1]["db_seconds"]):
+            requests = stats["requests"]
+            routes[route] = {
+                "requests": requests,
+                "queries_per_request": round(stats["queries"] / requests, 2),
+                "db_ms_per_request": round(stats["db_seconds"] * 1000 / requests, 3),
+                "max_queries": stats["max_queries"],
+                "requests_with_repeats": stats["requests_with_repeats"],
+                "slow_queries": stats["slow_queries"],
+                "repeated_statements": [
+                    {"statement": statement, "requests": count}
+                    for statement, count in stats["repeated"].most_common(TOP_REPEATED)
+                ],
+            }
+        return {
+            "enabled": self._engine is not None,
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "repeat_threshold": self.repeat_threshold,
+            "routes": routes,
+            "slow_queries": list(self.slow_queries),
+        }
+
+class SQLProfilerMiddleware:
+    def __init__(self, app: ASGIApp, profiler: SQLProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        profile = RequestProfile()
+
+        async def send_with_profile(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(SQL_PROFILE_HEADER, self.profiler.header(profile))
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            # Reset first so the EXPLAIN tasks started by record() are not profiled
+            _current.reset(token)
+            route = scope.get("route")
+            self.profiler.record(scope["method"], route.path if route is not None else "unmatched", profile)
+
+sql_profiler = SQLProfiler(
+    slow_query_ms=settings.SQL_PROFILER_SLOW_QUERY_MS,
+    repeat_threshold=settings.SQL_PROFILER_REPEAT_THRESHOLD,
+    history=settings.SQL_PROFILER_HISTORY
+)
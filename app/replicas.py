@@ -0,0 +1,220 @@
+"""Read replica routing.
+
+With ``DATABASE_REPLICA_URLS`` set, endpoints that only read take their
+session from ``get_read_db`` rather than ``get_db``. Each request gets the
+next replica in turn, skipping those that failed their last health check
+or, on PostgreSQL, lag the primary by more than ``REPLICA_MAX_LAG_SECONDS``.
+With no healthy replica left, reads fall back to the primary.
+
+Reads stay on the primary for ``REPLICA_PIN_SECONDS``:
+
+* for a client after any write it made, so a booking is in the list
+  fetched right after it;
+* for everyone after the catalog changed, so the catalog cache is not
+  refilled from a replica that has yet to replay the change.
+
+Keep the pin longer than the lag a replica is allowed. Without replicas
+``get_read_db`` hands out the same primary session as ``get_db``.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import List, Optional
+
+from fastapi import Depends
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import metrics
+from app.cache import TTLCache
+from app.catalog import catalog_cache
+from app.config import settings
+from app.database import get_db, to_async_url
+from app.limits import client_key
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+# Seconds since the last replayed transaction, or 0 when everything received
+# is replayed (an idle primary sends nothing, which is not lag)
+POSTGRESQL_LAG = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class Replica:
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_async_engine(
+            to_async_url(url),
+            pool_size=20,
+            max_overflow=0,
+            pool_pre_ping=True
+        )
+        self.sessions = async_sessionmaker(
+            self.engine,
+            class_=AsyncSession,
+            autoflush=False,
+            expire_on_commit=False
+        )
+        # None until the first health check, and unused until one passes
+        self.healthy: Optional[bool] = None
+        self.lag = 0.0
+        self.reads = 0
+
+class ReplicaRouter:
+    def __init__(self, urls: List[str], check_interval: float, max_lag: float, pin_seconds: float, max_clients: int):
+        self.replicas = [Replica(url) for url in urls]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.pin_seconds = pin_seconds
+        self.primary_reads = 0
+        self._pinned = TTLCache(maxsize=max_clients, ttl=pin_seconds)
+        self._turn = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def pin(self, key: str):
+        self._pinned.set(key, True)
+
+    async def route(self, key: str) -> Optional[Replica]:
+        """The replica to read from for client ``key``, or None for the primary."""
+        await catalog_cache.current_version()
+        changed_at = catalog_cache.changed_at
+        recently_changed = changed_at is not None and time.monotonic() - changed_at < self.pin_seconds
+        if not recently_changed and not self._pinned.get(key, False):
+            start = next(self._turn)
+            for offset in range(len(self.replicas)):
+                replica = self.replicas[(start + offset) % len(self.replicas)]
+                if replica.healthy:
+                    replica.reads += 1
+                    return replica
+        
+        self.primary_reads += 1
+        return None
+
+    def mark_down(self, replica: Replica):
+        if replica.healthy:
+            logger.warning("Read replica %s failed, reading from the others until it recovers", replica.name)
+        replica.healthy = False
+
+    async def check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                if replica.engine.dialect.name == "postgresql":
+                    replica.lag = float(await conn.scalar(POSTGRESQL_LAG))
+                else:
+                    await conn.execute(text("SELECT 1"))
+        except Exception:
+            if replica.healthy is not False:
+                logger.exception("Read replica %s failed its health check", replica.name)
+            replica.healthy = False
+            return
+        
+        if replica.lag > self.max_lag and replica.healthy is not False:
+            logger.warning("Read replica %s is %.1f s behind, skipping it", replica.name, replica.lag)
+        replica.healthy = replica.lag <= self.max_lag
+
+    async def _run(self):
+        while True:
+            await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "primary_reads": self.primary_reads,
+            "pinned_clients": len(self._pinned),
+            "replicas": [
+                {"name": replica.name, "healthy": replica.healthy, "lag_seconds": replica.lag, "reads": replica.reads}
+                for replica in self.replicas
+            ],
+        }
+
+class ReplicaPinMiddleware:
+    """Pins the client behind each write request to the primary as its response starts.
+    
+    Pinning any later could let the client's next read, sent as soon as it
+    has the response, reach a replica first.
+    """
+
+    def __init__(self, app: ASGIApp, router: ReplicaRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+        
+        key = client_key(HTTPConnection(scope))
+
+        async def send_pinned(message: Message):
+            if message["type"] == "http.response.start":
+                self.router.pin(key)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_pinned)
+        except Exception:
+            # No response went out, but the write may have gone through
+            self.router.pin(key)
+            raise
+
+replica_router = ReplicaRouter(
+    [url.strip() for url in (settings.DATABASE_REPLICA_URLS or "").split(",") if url.strip()],
+    check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL_SECONDS,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    pin_seconds=settings.REPLICA_PIN_SECONDS,
+    max_clients=settings.REPLICA_PIN_MAX_CLIENTS
+)
+
+async def get_read_db(connection: HTTPConnection, db: AsyncSession = Depends(get_db)):
+    # Falling back shares the request's primary session with the other
+    # dependencies, as get_db does, rather than holding a second connection
+    replica = None
+    if replica_router.replicas:
+        replica = await replica_router.route(client_key(connection))
+    if replica is None:
+        yield db
+        return
+    
+    async with replica.sessions() as replica_db:
+        try:
+            yield replica_db
+        except (OperationalError, InterfaceError):
+            replica_router.mark_down(replica)
+            raise
+
+replica_reads = metrics.Counter("db_replica_reads_total", "Read-only requests by the database that served them.", ("database",))
+replica_healthy = metrics.Gauge("db_replica_healthy", "Whether a read replica passed its last health check.", ("replica",))
+replica_lag = metrics.Gauge("db_replica_lag_seconds", "How far a read replica was behind at its last health check.", ("replica",))
+
+@metrics.on_scrape
+def _replica_stats():
+    if not replica_router.replicas:
+        return
+    replica_reads.set(replica_router.primary_reads, "primary")
+    for replica in replica_router.replicas:
+        replica_reads.set(replica.reads, replica.name)
+        replica_healthy.set(int(bool(replica.healthy)), replica.name)
+        replica_lag.set(replica.lag, replica.name)
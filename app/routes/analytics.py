@@ -0,0 +1,81 @@
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app import models, schemas
+from app.database import get_db
+from app.replicas import get_read_db
+from app.auth import get_current_admin_user
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.serialization import fast_json
+from app.services.analytics_service import (
+    get_cancellation_rate,
+    get_movie_daily_sales,
+    get_showtime_occupancy,
+    get_top_genres,
+    rebuild_sales_summary
+)
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+@router.get("/occupancy", response_model=List[schemas.ShowtimeOccupancy])
+async def showtime_occupancy_endpoint(
+    response: Response,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    movie_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    showtimes, next_cursor = await get_showtime_occupancy(
+        db,
+        start_from=start_from,
+        start_to=start_to,
+        movie_id=movie_id,
+        limit=limit,
+        cursor=cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return fast_json(showtimes, response)
+
+@router.get("/sales", response_model=List[schemas.MovieDailySales])
+async def movie_daily_sales_endpoint(
+    response: Response,
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+    movie_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    return fast_json(await get_movie_daily_sales(db, day_from, day_to, movie_id), response)
+
+@router.get("/cancellations", response_model=schemas.CancellationRate)
+async def cancellation_rate_endpoint(
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+    movie_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    return await get_cancellation_rate(db, day_from, day_to, movie_id)
+
+@router.get("/genres", response_model=List[schemas.GenreSales])
+async def top_genres_endpoint(
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    return await get_top_genres(db, day_from, day_to, limit)
+
+@router.post("/rebuild", response_model=schemas.SalesSummaryRebuild)
+async def rebuild_sales_summary_endpoint(
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_admin_user)
+):
+    return {"rows": await rebuild_sales_summary(db)}
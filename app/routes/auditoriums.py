@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app import models, schemas
+from app.database import get_db
+from app.replicas import get_read_db
+from app.auth import get_current_admin_user, get_current_user
+from app.services.auditorium_service import create_auditorium, get_auditorium, get_auditoriums, update_auditorium
+
+router = APIRouter(prefix="/auditoriums", tags=["auditoriums"])
+
+@router.get("", response_model=List[schemas.Auditorium])
+async def get_auditoriums_list(
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    return await get_auditoriums(db, is_admin=current_user.is_admin)
+
+@router.get("/{auditorium_id}", response_model=schemas.Auditorium)
+async def get_auditorium_detail(
+    auditorium_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    if auditorium_id <= 0:
+        raise HTTPException(status_code=400, detail="Invalid auditorium ID")
+    
+    db_auditorium = await get_auditorium(auditorium_id, db, is_admin=current_user.is_admin)
+    
+    if not db_auditorium:
+        raise HTTPException(status_code=404, detail="Auditorium not found")
+    
+    return db_auditorium
+
+@router.post("", response_model=schemas.Auditorium, status_code=status.HTTP_201_CREATED)
+async def create_auditorium_endpoint(
+    auditorium: schemas.AuditoriumCreate,
+    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await create_auditorium(auditorium, db)
+
+@router.put("/{auditorium_id}", response_model=schemas.Auditorium)
+async def update_auditorium_endpoint(
+    auditorium_id: int,
+    auditorium: schemas.AuditoriumCreate,
+    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    if auditorium_id <= 0:
+        raise HTTPException(status_code=400, detail="Invalid auditorium ID")
+    return await update_auditorium(auditorium_id, auditorium, db)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
-from app import schemas
+from app import models, schemas
+from app.auth import get_current_admin_user, principal_cache
 from app.database import get_db
 from app.config import settings
 from app.services.users import create_user, authenticate_user
@@ -11,8 +12,8 @@ from app.services.users import create_user, authenticate_user
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=schemas.User)
-async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = create_user(user, db)
+async def register_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await create_user(user, db)
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
@@ -21,6 +22,10 @@ async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db))
     return db_user 
 
 @router.post("/login", response_model=schemas.Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    access_token = authenticate_user(form_data.username, form_data.password, db)
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    access_token = await authenticate_user(form_data.username, form_data.password, db)
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/principal-cache")
+async def principal_cache_stats(current_user: models.User = Depends(get_current_admin_user)):
+    return principal_cache.stats()
\ No newline at end of file
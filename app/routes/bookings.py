@@ -1,41 +1,101 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app import models, schemas
 from app.database import get_db
+from app.replicas import get_read_db
+from app.idempotency import fingerprint, idempotent
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER
+from app.serialization import fast_json
 from app.auth import get_current_user, get_current_active_user
-from app.services.booking_service import create_booking, delete_booking, get_user_bookings, cancel_booking
+from app.services.booking_service import confirm_hold, create_booking, create_hold, delete_booking, get_user_bookings, cancel_booking
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
 
 @router.post("", response_model=schemas.Booking)
 async def create_booking_endpoint(
     booking: schemas.BookingCreate,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return create_booking(booking, current_user, db)
+    if idempotency_key is None:
+        return await create_booking(booking, current_user, db)
+    return await idempotent(
+        db,
+        current_user.id,
+        idempotency_key,
+        fingerprint("POST /bookings", booking.model_dump_json()),
+        lambda: create_booking(booking, current_user, db),
+        schemas.Booking
+    )
+
+@router.post("/holds", response_model=schemas.Booking)
+async def create_hold_endpoint(
+    booking: schemas.BookingCreate,
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await create_hold(booking, current_user, db)
+
+@router.post("/holds/{hold_id}/confirm", response_model=schemas.Booking)
+async def confirm_hold_endpoint(
+    hold_id: int,
+    current_user: models.User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await confirm_hold(hold_id, current_user, db)
 
 @router.get("", response_model=List[schemas.BookingWithDetails])
 async def get_user_bookings_endpoint(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    booking_status: Optional[str] = Query(None, alias="status"),
+    showtime_id: Optional[int] = None,
+    booked_from: Optional[datetime] = None,
+    booked_to: Optional[datetime] = None,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    return get_user_bookings(db, current_user, is_admin=current_user.is_admin)
+    bookings, next_cursor = await get_user_bookings(
+        db,
+        current_user,
+        is_admin=current_user.is_admin,
+        limit=limit,
+        cursor=cursor,
+        booking_status=booking_status,
+        showtime_id=showtime_id,
+        booked_from=booked_from,
+        booked_to=booked_to
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return fast_json(bookings, response)
 
 @router.patch("/{booking_id}")
 async def cancel_booking_endpoint(
     booking_id: int,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return cancel_booking(booking_id, current_user, db)
+    if idempotency_key is None:
+        return await cancel_booking(booking_id, current_user, db)
+    return await idempotent(
+        db,
+        current_user.id,
+        idempotency_key,
+        fingerprint(f"PATCH /bookings/{booking_id}"),
+        lambda: cancel_booking(booking_id, current_user, db)
+    )
 
 @router.delete("/{booking_id}")
 async def delete_booking_endpoint(
     booking_id: int,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    return delete_booking(booking_id, current_user, db)
\ No newline at end of file
+    return await delete_booking(booking_id, current_user, db)
\ No newline at end of file
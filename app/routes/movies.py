@@ -1,38 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app import models, schemas
 from app.database import get_db
+from app.replicas import get_read_db
 from app.auth import get_current_admin_user, get_current_user  
-from app.services.movie_service import delete_movie, get_movies, get_movie, create_movie, update_movie, deactivate_movie
+from app.config import settings
+from app.http_cache import catalog_etag, conditional
+from app.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER
+from app.serialization import fast_json
+from app.services.movie_service import autocomplete_movies, delete_movie, estimate_movies_count, get_movies, get_movie, create_movie, search_movies, update_movie, deactivate_movie
 
 router = APIRouter(prefix="/movies", tags=["movies"])
 
 @router.get("", response_model=List[schemas.Movie])  
-async def get_movies_list(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return get_movies(db, skip=skip, limit=limit, is_admin=current_user.is_admin)
+async def get_movies_list(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    skip: Optional[int] = Query(None, ge=0, deprecated=True),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    movies, next_cursor = await get_movies(
+        db,
+        skip=skip,
+        limit=limit,
+        is_admin=current_user.is_admin,
+        cursor=cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if include_total:
+        total = await estimate_movies_count(db, is_admin=current_user.is_admin)
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(total)
+    
+    etag = catalog_etag(movies, next_cursor, response.headers.get(TOTAL_ESTIMATE_HEADER))
+    return conditional(request, response, etag, max_age=settings.CATALOG_MAX_AGE_SECONDS) or fast_json(movies, response)
+
+@router.get("/search", response_model=List[schemas.Movie])
+async def search_movies_endpoint(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    movies = await search_movies(q, db, limit=limit, is_admin=current_user.is_admin)
+    return fast_json(movies, response)
+
+@router.get("/autocomplete", response_model=List[schemas.MovieSuggestion])
+async def autocomplete_movies_endpoint(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    suggestions = await autocomplete_movies(q, db, limit=limit, is_admin=current_user.is_admin)
+    return fast_json(suggestions, response)
 
 @router.get("/{movie_id}", response_model=schemas.Movie)
-async def get_movie_detail(movie_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+async def get_movie_detail(request: Request, response: Response, movie_id: int, db: AsyncSession = Depends(get_read_db), current_user: models.User = Depends(get_current_user)):
     if movie_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid movie ID")
     
-    db_movie = get_movie(movie_id, db, is_admin=current_user.is_admin)
+    db_movie = await get_movie(movie_id, db, is_admin=current_user.is_admin)
     
     if not db_movie:
         raise HTTPException(status_code=404, detail="Movie not found")
     
-    return db_movie
+    etag = catalog_etag([db_movie])
+    return conditional(request, response, etag, max_age=settings.CATALOG_MAX_AGE_SECONDS) or db_movie
 
 @router.post("", response_model=schemas.Movie, status_code=status.HTTP_201_CREATED)  
 async def create_movie_endpoint(
     movie: schemas.MovieCreate, 
     current_user: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
-        return create_movie(movie, db)
+        return await create_movie(movie, db)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -46,12 +97,12 @@ async def update_movie_endpoint(
     movie_id: int, 
     movie: schemas.MovieCreate, 
     current_user: models.User = Depends(get_current_admin_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if movie_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid movie ID")
     try:
-        return update_movie(movie_id, movie, db)
+        return await update_movie(movie_id, movie, db)
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -64,19 +115,19 @@ async def update_movie_endpoint(
 async def deactivate_movie_endpoint(
     movie_id: int,
     current_user: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if movie_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid movie ID")
-    return deactivate_movie(movie_id, db)
+    return await deactivate_movie(movie_id, db)
 
 @router.delete("/{movie_id}")
 async def delete_movie_endpoint(
     movie_id: int,
     current_user: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if movie_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid movie ID")
-    result = delete_movie(movie_id, db)
+    result = await delete_movie(movie_id, db)
     return {"message": "Movie deleted successfully"}
\ No newline at end of file
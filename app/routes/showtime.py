@@ -1,31 +1,123 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+import asyncio
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app import models, schemas
 from app.database import get_db
-from app.auth import get_current_admin_user, get_current_user 
-from app.services.showtime_service import deactivate_showtime, get_all_showtimes, create_showtime, get_showtime, update_showtime, delete_showtime
+from app.replicas import get_read_db
+from app.auth import authenticate_token, get_current_admin_user, get_current_user 
+from app.availability import watch
+from app.config import settings
+from app.http_cache import catalog_etag, conditional
+from app.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, TOTAL_ESTIMATE_HEADER
+from app.serialization import fast_json
+from app.services.showtime_service import deactivate_showtime, estimate_showtimes_count, get_all_showtimes, get_seat_map, create_showtime, create_showtimes_bulk, get_showtime, update_showtime, delete_showtime
 
 router = APIRouter(prefix="/showtimes", tags=["showtimes"]) 
 
+# Seat availability changes without touching the catalog, so it is part of the tag
+SHOWTIME_ETAG_FIELDS = ("id", "updated_at", "available_seats")
+
 @router.get("", response_model=List[schemas.Showtime])
 async def get_all_showtimes_endpoint(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    skip: Optional[int] = Query(None, ge=0, deprecated=True),
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
+):
+    showtimes, next_cursor = await get_all_showtimes(
+        db,
+        skip=skip,
+        limit=limit,
+        is_admin=current_user.is_admin,
+        cursor=cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if include_total:
+        total = await estimate_showtimes_count(db, is_admin=current_user.is_admin)
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(total)
+    
+    etag = catalog_etag(
+        showtimes, next_cursor, response.headers.get(TOTAL_ESTIMATE_HEADER),
+        fields=SHOWTIME_ETAG_FIELDS
+    )
+    return conditional(request, response, etag) or fast_json(showtimes, response)
+
+def _watched_showtimes(showtime_ids: List[int]):
+    if len(set(showtime_ids)) > settings.AVAILABILITY_MAX_SHOWTIMES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.AVAILABILITY_MAX_SHOWTIMES} showtimes can be watched at once"
+        )
+    return set(showtime_ids)
+
+async def _availability_events(showtime_ids):
+    async for updates in watch(showtime_ids, settings.AVAILABILITY_KEEPALIVE_SECONDS):
+        if not updates:
+            yield ": keepalive\n\n"
+        for showtime_id, available_seats in updates.items():
+            data = orjson.dumps({"showtime_id": showtime_id, "available_seats": available_seats})
+            yield f"event: availability\ndata: {data.decode()}\n\n"
+
+@router.get("/availability/stream")
+async def stream_availability_endpoint(
+    showtime_ids: List[int] = Query(...),
+    token: str = Query(...)
+):
+    """Server-sent events with the available seats of the given showtimes, as they change."""
+    await authenticate_token(token)
+    watched = _watched_showtimes(showtime_ids)
+    return StreamingResponse(
+        _availability_events(watched),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.websocket("/availability/ws")
+async def availability_websocket(
+    websocket: WebSocket,
+    showtime_ids: List[int] = Query(...),
+    token: str = Query(...)
 ):
-    showtimes = get_all_showtimes(db, skip=skip, limit=limit, is_admin=current_user.is_admin)
-    return showtimes
+    try:
+        await authenticate_token(token)
+        watched = _watched_showtimes(showtime_ids)
+    except HTTPException as exc:
+        await websocket.close(code=1008, reason=str(exc.detail))
+        return
+    
+    await websocket.accept()
+    
+    async def push():
+        async for updates in watch(watched, settings.AVAILABILITY_KEEPALIVE_SECONDS):
+            for showtime_id, available_seats in updates.items():
+                await websocket.send_json({"showtime_id": showtime_id, "available_seats": available_seats})
+    
+    # Clients only listen; reading is just how a disconnect is noticed
+    pusher = asyncio.create_task(push())
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        pusher.cancel()
 
 @router.get("/{showtime_id}", response_model=schemas.Showtime)
 async def get_showtime_by_id_endpoint(
+    request: Request,
+    response: Response,
     showtime_id: int,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    showtime = get_showtime(
+    showtime = await get_showtime(
         db, 
         showtime_id=showtime_id, 
         is_admin=current_user.is_admin)
@@ -36,47 +128,64 @@ async def get_showtime_by_id_endpoint(
             detail="Showtime not found"
         )
     
-    return showtime
+    etag = catalog_etag([showtime], fields=SHOWTIME_ETAG_FIELDS)
+    return conditional(request, response, etag) or showtime
+
+@router.get("/{showtime_id}/seats", response_model=schemas.SeatMap)
+async def get_seat_map_endpoint(
+    showtime_id: int,
+    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await get_seat_map(db, showtime_id, is_admin=current_user.is_admin)
 
 @router.post("", response_model=schemas.Showtime) 
 async def create_showtime_endpoint(
     showtime_data: schemas.ShowtimeCreate,
     current_user: models.User = Depends(get_current_admin_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    db_showtime = create_showtime(showtime_data, db)
+    db_showtime = await create_showtime(showtime_data, db)
     return db_showtime 
 
+@router.post("/bulk", response_model=schemas.ShowtimeBulkResult)
+async def create_showtimes_bulk_endpoint(
+    batch: schemas.ShowtimeBulkCreate,
+    current_user: models.User = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await create_showtimes_bulk(batch, db)
+
 @router.put("/{showtime_id}", response_model=schemas.Showtime)
 async def update_showtime_endpoint(
     showtime_id: int, 
     showtime_data: schemas.ShowtimeCreate,
     current_user: models.User = Depends(get_current_admin_user), 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if showtime_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid showtime ID")
-    db_showtime = update_showtime(showtime_id, showtime_data, db)
+    db_showtime = await update_showtime(showtime_id, showtime_data, db)
     return db_showtime  
 
 @router.delete("/{showtime_id}")
 async def delete_showtime_endpoint(
     showtime_id: int,
     current_user: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if showtime_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid showtime ID")
-    result = delete_showtime(showtime_id, db)
+    result = await delete_showtime(showtime_id, db)
     return {"message": "Showtime deleted successfully"}
 
 @router.patch("/{showtime_id}/deactivate")
 async def deactivate_showtime_endpoint(
     showtime_id: int,
     current_user: models.User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if showtime_id <= 0:
         raise HTTPException(status_code=400, detail="Invalid showtime ID")
-    result = deactivate_showtime(showtime_id, db)
+    result = await deactivate_showtime(showtime_id, db)
     return {"message": "Showtime deactivated successfully"}
\ No newline at end of file
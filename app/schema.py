@@ -0,0 +1,42 @@
+import warnings
+from pathlib import Path
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import SAWarning
+
+from app import models  # noqa: F401  (registers the tables on Base.metadata)
+from app.database import Base
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+# SQLite cannot reflect those indexes at all and says so on every comparison
+warnings.filterwarnings("ignore", message="Skipped unsupported reflection of expression-based index", category=SAWarning)
+
+class SchemaDriftError(RuntimeError):
+    pass
+
+def include_name(name, type_, parent_names) -> bool:
+    """Skip the indexes the models create as raw DDL, which cannot be compared."""
+    return not (type_ == "index" and name in models.DDL_INDEXES)
+
+def check_schema(connection: Connection):
+    """Refuse to run against a database that is not migrated to head or
+    whose tables and indexes differ from the models."""
+    context = MigrationContext.configure(connection, opts={"include_name": include_name})
+    
+    head = ScriptDirectory.from_config(Config(str(ALEMBIC_INI))).get_current_head()
+    current = context.get_current_revision()
+    if current != head:
+        raise SchemaDriftError(
+            f"Database is at revision {current}, expected {head}. Run 'alembic upgrade head'."
+        )
+    
+    diff = compare_metadata(context, Base.metadata)
+    if diff:
+        raise SchemaDriftError(
+            "Database schema does not match the models:\n"
+            + "\n".join(f"  {change}" for change in diff)
+        )
@@ -1,7 +1,7 @@
 import re
 from typing import Optional, List
-from pydantic import BaseModel, EmailStr, field_validator
-from datetime import datetime, timezone
+from pydantic import BaseModel, EmailStr, field_validator, model_validator
+from datetime import date, datetime, timezone
 
 # User schemas
 class UserBase(BaseModel):
@@ -84,6 +84,44 @@ class Movie(MovieBase):
     id: int
     is_active: bool
     created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# Auditorium schemas
+class MovieSuggestion(BaseModel):
+    id: int
+    title: str
+
+class AuditoriumBase(BaseModel):
+    name: str
+    total_seats: int
+    seats_per_row: int = 20
+
+class AuditoriumCreate(AuditoriumBase):
+    @field_validator('name', mode='before')
+    def validate_name_non_empty(cls, v):
+        if not v or not v.strip():
+            raise ValueError('Name cannot be empty')
+        return v
+
+    @field_validator('total_seats')
+    def validate_total_seats(cls, v):
+        if v <= 0:
+            raise ValueError('Total seats must be greater than 0')
+        return v
+
+    @field_validator('seats_per_row')
+    def validate_seats_per_row(cls, v):
+        if v <= 0:
+            raise ValueError('Seats per row must be greater than 0')
+        return v
+
+class Auditorium(AuditoriumBase):
+    id: int
+    is_active: bool
+    created_at: datetime
 
     class Config:
         from_attributes = True
@@ -91,6 +129,7 @@ class Movie(MovieBase):
 # Showtime schemas
 class ShowtimeBase(BaseModel):
     movie_id: int
+    auditorium_id: int
     start_time: datetime
     total_seats: int
 
@@ -113,14 +152,49 @@ class Showtime(ShowtimeBase):
     available_seats: int
     is_active: bool
     created_at: datetime
+    updated_at: datetime
 
     class Config:
         from_attributes = True
 
+class ShowtimeBulkCreate(BaseModel):
+    showtimes: List[ShowtimeCreate]
+
+    @field_validator('showtimes')
+    def validate_batch_size(cls, v):
+        if not v:
+            raise ValueError('At least one showtime is required')
+        if len(v) > 1000:
+            raise ValueError('At most 1000 showtimes can be scheduled at once')
+        return v
+
+class ShowtimeBulkItem(BaseModel):
+    # Position of the showtime in the request
+    index: int
+    showtime: Optional[Showtime] = None
+    error: Optional[str] = None
+
+class ShowtimeBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[ShowtimeBulkItem]
+
+class SeatMap(BaseModel):
+    showtime_id: int
+    total_seats: int
+    seats_per_row: int
+    available_seats: int
+    # Base64 of the packed bitmap, bit i set when seat i is taken
+    seat_map: str
+    taken_seats: List[int]
+    # Row-lettered names of the taken seats, e.g. "A1"
+    taken_labels: List[str]
+
 # Booking schemas
 class BookingBase(BaseModel):
     showtime_id: int
     seats: int
+    seat_numbers: Optional[List[int]] = None
 
 class BookingCreate(BookingBase):
     @field_validator('seats')
@@ -129,15 +203,68 @@ class BookingCreate(BookingBase):
             raise ValueError('Seats must be greater than 0')
         return v
 
+    @field_validator('seat_numbers')
+    def validate_seat_numbers(cls, v):
+        if v is not None:
+            if any(seat < 0 for seat in v):
+                raise ValueError('Seat numbers cannot be negative')
+            if len(set(v)) != len(v):
+                raise ValueError('Seat numbers must be unique')
+            v = sorted(v)
+        return v
+
+    @model_validator(mode='after')
+    def validate_seat_count(self):
+        if self.seat_numbers is not None and len(self.seat_numbers) != self.seats:
+            raise ValueError('Seats must match the number of seat numbers')
+        return self
+
 class Booking(BookingBase):
     id: int
     user_id: int
     status: str
+    hold_expires_at: Optional[datetime] = None
     booking_time: datetime
 
     class Config:
         from_attributes = True
 
+# Analytics schemas
+class ShowtimeOccupancy(BaseModel):
+    showtime_id: int
+    movie_id: int
+    auditorium_id: int
+    start_time: datetime
+    total_seats: int
+    sold_seats: int
+    occupancy: float
+
+class MovieDailySales(BaseModel):
+    movie_id: int
+    day: date
+    bookings: int
+    tickets: int
+    cancelled_bookings: int
+    cancelled_tickets: int
+
+    class Config:
+        from_attributes = True
+
+class CancellationRate(BaseModel):
+    bookings: int
+    cancelled_bookings: int
+    tickets: int
+    cancelled_tickets: int
+    cancellation_rate: float
+
+class GenreSales(BaseModel):
+    genre: str
+    tickets: int
+    bookings: int
+
+class SalesSummaryRebuild(BaseModel):
+    rows: int
+
 # Response schemas
 class ShowtimeWithMovie(Showtime):
     movie: Movie
@@ -0,0 +1,325 @@
+"""In-memory movie search, for databases without full-text indexes (SQLite).
+
+PostgreSQL answers searches from the GIN indexes in ``app.models``. Elsewhere
+``movie_search_index`` keeps an inverted index of the catalog in process:
+
+* ``search`` ranks movies holding every query word, weighting title, genre
+  and description matches like PostgreSQL's default ``ts_rank`` weights.
+* ``suggest`` completes what was typed so far: titles starting with it
+  first, then titles with a word starting with each term, then the same
+  allowing a typo or two per term.
+
+The index follows the catalog version: when an admin write bumps it, only
+movies updated since the last refresh are re-read. It is rebuilt in full
+only after a movie was deleted or when most of the catalog changed.
+"""
+import asyncio
+import math
+import re
+from bisect import bisect_left, insort
+from datetime import datetime
+from heapq import nlargest
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# Relative weight of a match per field, as PostgreSQL's A, B and C weights
+FIELD_WEIGHTS = (("title", 1.0), ("genre", 0.4), ("description", 0.2))
+
+# Dropped from queries and documents, as the english text search config does
+STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+# A refresh touching more than 1/REBUILD_FRACTION of the movies rebuilds instead
+REBUILD_FRACTION = 10
+
+# Further terms are checked title by title once the candidates are this few
+CHECK_TITLES_BELOW = 500
+
+_WORD = re.compile(r"\w+")
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _WORD.findall(text.lower()) if text else []
+
+def max_typos(term: str) -> int:
+    # Short prefixes are ambiguous enough already
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+def fuzzy_prefixes(vocabulary: List[str], term: str, max_edits: int) -> Iterator[Tuple[str, int]]:
+    """Yield (word, edits) for the words in sorted ``vocabulary`` that start
+    with ``term`` give or take ``max_edits`` typos: a letter added, dropped,
+    changed, or swapped with its neighbour.
+    
+    Walks the sorted list as a trie: consecutive words share the edit
+    distance rows of their common prefix, and a prefix that is already too
+    far from ``term`` skips every word under it with one bisect.
+    """
+    if max_edits == 0 or not term:
+        index = bisect_left(vocabulary, term)
+        while index < len(vocabulary) and vocabulary[index].startswith(term):
+            yield vocabulary[index], 0
+            index += 1
+        return
+    
+    size = len(term)
+    # rows[d] is the distance row for the first d letters of the current word
+    rows = [[min(position, max_edits + 1) for position in range(size + 1)]]
+    previous = ""
+    # Typos in the very first letter are rare, and allowing them would mean
+    # walking the whole vocabulary
+    index = bisect_left(vocabulary, term[0])
+    end = bisect_left(vocabulary, chr(ord(term[0]) + 1))
+    while index < end:
+        word = vocabulary[index]
+        shared = 0
+        limit = min(len(previous), len(word), len(rows) - 1)
+        while shared < limit and previous[shared] == word[shared]:
+            shared += 1
+        del rows[shared + 1:]
+        
+        hopeless = None
+        # Past size + max_edits letters the prefix cannot get closer
+        for depth in range(shared, min(len(word), size + max_edits)):
+            last = rows[-1]
+            letter = word[depth]
+            # Only cells within max_edits of the diagonal can stay in reach;
+            # the rest just need to read as too far
+            row = [max_edits + 1] * (size + 1)
+            if depth + 1 <= max_edits:
+                row[0] = depth + 1
+            for position in range(max(1, depth + 1 - max_edits), min(size, depth + 1 + max_edits) + 1):
+                edits = min(
+                    row[position - 1] + 1,
+                    last[position] + 1,
+                    last[position - 1] + (term[position - 1] != letter)
+                )
+                # Two neighbouring letters swapped count as one typo
+                if (
+                    position > 1 and depth > 0
+                    and term[position - 1] == word[depth - 1] and term[position - 2] == letter
+                ):
+                    edits = min(edits, rows[-2][position - 2] + 1)
+                row[position] = edits
+            rows.append(row)
+            if min(row) > max_edits:
+                hopeless = word[:depth + 1]
+                break
+        
+        edits = min(row[size] for row in rows)
+        if hopeless is not None and edits > max_edits:
+            index = bisect_left(vocabulary, hopeless[:-1] + chr(ord(hopeless[-1]) + 1), index, end)
+            previous = hopeless
+            continue
+        
+        if edits <= max_edits:
+            yield word, edits
+        previous = word
+        index += 1
+
+class _Entry:
+    __slots__ = ("title", "normalized", "words", "terms", "is_active")
+
+    def __init__(self, row):
+        self.title = row.title
+        self.words = tokenize(row.title)
+        self.normalized = " ".join(self.words)
+        self.is_active = bool(row.is_active)
+        self.terms: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS:
+            for term in tokenize(getattr(row, field)):
+                if term not in STOP_WORDS:
+                    self.terms[term] = self.terms.get(term, 0.0) + weight
+
+class MovieSearchIndex:
+    def __init__(self):
+        # Catalog version and newest updated_at the index reflects
+        self.version: Optional[int] = None
+        self._since: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._movies: Dict[int, _Entry] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._word_ids: Dict[str, Set[int]] = {}
+        self._vocabulary: List[str] = []
+        self._titles: List[Tuple[str, int]] = []
+        self._since = None
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+    async def refresh(self, db: AsyncSession, version: int):
+        if version == self.version:
+            return
+        
+        async with self._lock:
+            if version == self.version:
+                return
+            
+            columns = (
+                models.Movie.id, models.Movie.title, models.Movie.genre, models.Movie.description,
+                models.Movie.is_active, models.Movie.updated_at
+            )
+            query = select(*columns)
+            if self._since is not None:
+                query = query.filter(models.Movie.updated_at >= self._since)
+            changed = (await db.execute(query)).all()
+            total = await db.scalar(select(func.count()).select_from(models.Movie))
+            
+            # Patch small changes in; rebuild after a delete, which leaves no
+            # trace of what went, or when most of the catalog changed anyway
+            rebuild = self._since is None or len(changed) > len(self._movies) // REBUILD_FRACTION
+            if not rebuild:
+                for row in changed:
+                    self._add(row, ordered=True)
+                rebuild = len(self._movies) != total
+            if rebuild:
+                if self._since is not None:
+                    changed = (await db.execute(select(*columns))).all()
+                self._clear()
+                for row in changed:
+                    self._add(row, ordered=False)
+                self._vocabulary.sort()
+                self._titles.sort()
+            
+            if changed:
+                newest = max(row.updated_at for row in changed)
+                self._since = newest if self._since is None else max(self._since, newest)
+            self.version = version
+
+    def _add(self, row, ordered: bool):
+        if row.id in self._movies:
+            self._remove(row.id)
+        
+        entry = self._movies[row.id] = _Entry(row)
+        for term, weight in entry.terms.items():
+            self._postings.setdefault(term, {})[row.id] = weight
+        for word in set(entry.words):
+            ids = self._word_ids.get(word)
+            if ids is None:
+                ids = self._word_ids[word] = set()
+                if ordered:
+                    insort(self._vocabulary, word)
+                else:
+                    self._vocabulary.append(word)
+            ids.add(row.id)
+        if ordered:
+            insort(self._titles, (entry.normalized, row.id))
+        else:
+            self._titles.append((entry.normalized, row.id))
+
+    def _remove(self, movie_id: int):
+        entry = self._movies.pop(movie_id)
+        for term in entry.terms:
+            postings = self._postings[term]
+            del postings[movie_id]
+            if not postings:
+                del self._postings[term]
+        for word in set(entry.words):
+            ids = self._word_ids[word]
+            ids.discard(movie_id)
+            if not ids:
+                del self._word_ids[word]
+                del self._vocabulary[bisect_left(self._vocabulary, word)]
+        del self._titles[bisect_left(self._titles, (entry.normalized, movie_id))]
+
+    def _visible(self, movie_id: int, is_admin: bool) -> bool:
+        return is_admin or self._movies[movie_id].is_active
+
+    def search(self, query: str, limit: int, is_admin: bool = False) -> List[int]:
+        """Ids of the movies matching every word of ``query``, best first."""
+        terms = [term for term in dict.fromkeys(tokenize(query)) if term not in STOP_WORDS]
+        if not terms:
+            return []
+        
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return []
+        postings.sort(key=len)
+        
+        total = len(self._movies)
+        idf = [math.log(1 + total / len(matches)) for matches in postings]
+
+        def score(movie_id: int) -> float:
+            return sum(
+                weight * matches[movie_id] / (matches[movie_id] + 1)
+                for weight, matches in zip(idf, postings)
+            )
+
+        candidates = [
+            movie_id for movie_id in postings[0]
+            if all(movie_id in matches for matches in postings[1:]) and self._visible(movie_id, is_admin)
+        ]
+        return nlargest(limit, candidates, key=lambda movie_id: (score(movie_id), -movie_id))
+
+    def suggest(self, query: str, limit: int, is_admin: bool = False) -> List[dict]:
+        """Titles completing ``query`` as typed so far, best first."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        
+        found: List[int] = []
+        phrase = " ".join(terms)
+        index = bisect_left(self._titles, (phrase,))
+        while index < len(self._titles) and len(found) < limit:
+            normalized, movie_id = self._titles[index]
+            if not normalized.startswith(phrase):
+                break
+            if self._visible(movie_id, is_admin):
+                found.append(movie_id)
+            index += 1
+        
+        # Exact prefixes first; typos only when those do not fill the list
+        for typos in (False, True):
+            if len(found) >= limit:
+                break
+            seen = set(found)
+            matches = self._matching_words(terms, typos)
+            ranked = sorted(
+                (edits, len(self._movies[movie_id].title), self._movies[movie_id].normalized, movie_id)
+                for movie_id, edits in matches.items()
+                if movie_id not in seen and self._visible(movie_id, is_admin)
+            )
+            found.extend(movie_id for *_, movie_id in ranked[:limit - len(found)])
+        
+        return [{"id": movie_id, "title": self._movies[movie_id].title} for movie_id in found]
+
+    def _matching_words(self, terms: List[str], typos: bool) -> Dict[int, int]:
+        """Movies with a title word starting with each term, and the edits that took."""
+        matches: Optional[Dict[int, int]] = None
+        # Longest terms first: they match the fewest words
+        for term in sorted(terms, key=len, reverse=True):
+            max_edits = max_typos(term) if typos else 0
+            edits_by_movie: Dict[int, int] = {}
+            if matches is not None and len(matches) <= CHECK_TITLES_BELOW:
+                # Cheaper to look at the few titles left than the whole vocabulary
+                for movie_id in matches:
+                    edits = min(
+                        (edits for word in self._movies[movie_id].words for _, edits in fuzzy_prefixes([word], term, max_edits)),
+                        default=None
+                    )
+                    if edits is not None:
+                        edits_by_movie[movie_id] = edits
+            else:
+                for word, edits in fuzzy_prefixes(self._vocabulary, term, max_edits):
+                    for movie_id in self._word_ids[word]:
+                        if matches is not None and movie_id not in matches:
+                            continue
+                        if edits < edits_by_movie.get(movie_id, edits + 1):
+                            edits_by_movie[movie_id] = edits
+            matches = {
+                movie_id: edits + (matches[movie_id] if matches is not None else 0)
+                for movie_id, edits in edits_by_movie.items()
+            }
+            if not matches:
+                break
+        return matches or {}
+
+movie_search_index = MovieSearchIndex()
@@ -0,0 +1,43 @@
+"""Seat inventory packed one bit per seat; bit ``i`` set means seat ``i`` is taken.
+
+A 500-seat house fits in 63 bytes, and availability checks are plain integer
+bitwise operations instead of per-seat rows or queries.
+"""
+import string
+from typing import Iterable, List, Optional
+
+def size_in_bytes(total_seats: int) -> int:
+    return (total_seats + 7) // 8
+
+def empty(total_seats: int) -> bytes:
+    return bytes(size_in_bytes(total_seats))
+
+def to_int(seat_map: Optional[bytes]) -> int:
+    return int.from_bytes(seat_map or b"", "little")
+
+def to_bytes(bits: int, total_seats: int) -> bytes:
+    return bits.to_bytes(size_in_bytes(total_seats), "little")
+
+def mask(seat_numbers: Iterable[int]) -> int:
+    bits = 0
+    for seat in seat_numbers:
+        bits |= 1 << seat
+    return bits
+
+def seats_in(bits: int) -> List[int]:
+    seats = []
+    while bits:
+        lowest = bits & -bits
+        seats.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return seats
+
+def label(seat: int, seats_per_row: int) -> str:
+    """Human readable seat name: rows are lettered, seats numbered from 1 (A1, A2, ...)."""
+    row, number = divmod(seat, seats_per_row)
+    letters = ""
+    row += 1
+    while row:
+        row, remainder = divmod(row - 1, 26)
+        letters = string.ascii_uppercase[remainder] + letters
+    return f"{letters}{number + 1}"
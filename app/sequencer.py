@@ -0,0 +1,125 @@
+"""Group commit for bookings on hot showtimes.
+
+While a showtime sees at most ``threshold`` concurrent bookings in this
+process, each booking runs its own short transaction. Past that, every
+further request for it is queued to a single worker for that showtime.
+The worker takes whatever has queued up (up to ``max_batch``), settles the
+whole batch against the seat count in one transaction, and answers each
+caller. Bookings then stop queueing on the row lock one by one. The worker
+retires once the showtime has been quiet for ``idle_seconds``.
+"""
+import asyncio
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+class _Lane:
+    def __init__(self):
+        self.pending: Deque[Tuple[Any, asyncio.Future]] = deque()
+        self.wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+class BookingSequencer:
+    def __init__(
+        self,
+        apply_batch: Callable[[int, List[Any]], Awaitable[List[Any]]],
+        enabled: bool,
+        threshold: int,
+        max_batch: int,
+        idle_seconds: float
+    ):
+        self.apply_batch = apply_batch
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_batch = max_batch
+        self.idle_seconds = idle_seconds
+        self.batches = 0
+        self.sequenced = 0
+        self._in_flight: Dict[int, int] = defaultdict(int)
+        self._lanes: Dict[int, _Lane] = {}
+
+    def is_hot(self, showtime_id: int) -> bool:
+        return self.enabled and (
+            showtime_id in self._lanes or self._in_flight.get(showtime_id, 0) >= self.threshold
+        )
+
+    @contextmanager
+    def track(self, showtime_id: int):
+        """Count a booking taking the direct path, which is what marks a showtime hot."""
+        self._in_flight[showtime_id] += 1
+        try:
+            yield
+        finally:
+            self._in_flight[showtime_id] -= 1
+            if not self._in_flight[showtime_id]:
+                del self._in_flight[showtime_id]
+
+    async def submit(self, showtime_id: int, request: Any) -> Any:
+        lane = self._lanes.get(showtime_id)
+        if lane is None:
+            lane = self._lanes[showtime_id] = _Lane()
+            # A clean context, so the worker is not mistaken for the request that woke it
+            lane.task = contextvars.Context().run(
+                asyncio.get_running_loop().create_task, self._run(showtime_id, lane)
+            )
+        
+        future = asyncio.get_running_loop().create_future()
+        lane.pending.append((request, future))
+        lane.wake.set()
+        return await future
+
+    async def _run(self, showtime_id: int, lane: _Lane):
+        try:
+            while True:
+                if not lane.pending:
+                    lane.wake.clear()
+                    try:
+                        await asyncio.wait_for(lane.wake.wait(), self.idle_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    if not lane.pending:
+                        break
+                
+                batch = [lane.pending.popleft() for _ in range(min(len(lane.pending), self.max_batch))]
+                # Callers that gave up (e.g. disconnected) are not booked
+                batch = [(request, future) for request, future in batch if not future.done()]
+                if not batch:
+                    continue
+                
+                try:
+                    results = await self.apply_batch(showtime_id, [request for request, _ in batch])
+                except Exception as exc:
+                    results = [exc] * len(batch)
+                
+                self.batches += 1
+                self.sequenced += len(batch)
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, BaseException):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        finally:
+            del self._lanes[showtime_id]
+            for _, future in lane.pending:
+                if not future.done():
+                    future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "hot_showtimes": len(self._lanes),
+            "batches": self.batches,
+            "sequenced_bookings": self.sequenced,
+            "average_batch": round(self.sequenced / self.batches, 2) if self.batches else 0.0,
+        }
+
+    async def stop(self):
+        for lane in list(self._lanes.values()):
+            lane.task.cancel()
+            try:
+                await lane.task
+            except asyncio.CancelledError:
+                pass
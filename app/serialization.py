@@ -0,0 +1,39 @@
+"""Fast JSON path for list endpoints.
+
+Read endpoints select plain column rows shaped after their response schema
+and encode them straight to JSON with orjson, skipping ORM hydration and the
+pydantic validation FastAPI runs on a ``response_model``. The schemas still
+document the responses; ``benchmarks/serialization.py`` compares both paths.
+"""
+from typing import List, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+def schema_columns(schema: Type[BaseModel], model, prefix: str = "") -> List:
+    """Columns of ``model`` backing the fields of ``schema``, labelled ``prefix + name``."""
+    table_columns = model.__table__.c
+    return [
+        table_columns[name].label(prefix + name)
+        for name in schema.model_fields
+        if name in table_columns
+    ]
+
+def as_dicts(result) -> List[dict]:
+    return [dict(row) for row in result.mappings()]
+
+def unprefix(row, schema: Type[BaseModel], model, prefix: str) -> dict:
+    table_columns = model.__table__.c
+    return {name: row[prefix + name] for name in schema.model_fields if name in table_columns}
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        # UTC as "Z", the same way pydantic writes it
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+def fast_json(content, response: Response) -> FastJSONResponse:
+    """Encode ``content`` keeping any headers already set on the endpoint's ``response``."""
+    return FastJSONResponse(content, headers=dict(response.headers))
@@ -0,0 +1,197 @@
+"""Aggregate views for admins, read from ``movie_daily_sales``.
+
+The booking service adds each sale, cancellation and deletion to that table
+in the same transaction as the booking itself, so the dashboards read a few
+rows per movie and day however long the booking history grows. Occupancy
+needs no summary of its own: every showtime already keeps its seat counter.
+``rebuild_sales_summary`` recomputes the table from ``bookings`` in bulk.
+"""
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy import Date, case, cast, delete, desc, func, insert, literal, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.metrics import timed
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.serialization import as_dicts
+
+SALES = models.MovieDailySales
+SALES_COUNTS = ("bookings", "tickets", "cancelled_bookings", "cancelled_tickets")
+
+def _sales_day(booking_time: datetime) -> date:
+    # SQLite hands back naive datetimes, already in UTC
+    if booking_time.tzinfo is not None:
+        booking_time = booking_time.astimezone(timezone.utc)
+    return booking_time.date()
+
+def _upsert(db: AsyncSession):
+    return (postgresql if db.bind.dialect.name == "postgresql" else sqlite).insert(SALES)
+
+async def record_sales(db: AsyncSession, showtime_id: int, booking_time: datetime, **counts: int):
+    """Add ``counts`` (negative to take back) to the showtime's movie on the booking's day.
+    
+    Runs in the caller's transaction and does not commit. Callers have
+    already written to the showtime row, so the summary row is always the
+    last lock a booking transaction takes.
+    """
+    upsert = _upsert(db).from_select(
+        ["movie_id", "day", *SALES_COUNTS],
+        select(
+            models.Showtime.movie_id,
+            literal(_sales_day(booking_time), Date),
+            *(literal(counts.get(name, 0)) for name in SALES_COUNTS)
+        ).where(models.Showtime.id == showtime_id)
+    )
+    await db.execute(upsert.on_conflict_do_update(
+        index_elements=[SALES.movie_id, SALES.day],
+        set_={name: getattr(SALES, name) + getattr(upsert.excluded, name) for name in SALES_COUNTS}
+    ))
+
+def _day_of(column, dialect: str):
+    if dialect == "postgresql":
+        return cast(func.timezone("UTC", column), Date)
+    return func.date(column)
+
+@timed
+async def rebuild_sales_summary(db: AsyncSession):
+    """Recompute ``movie_daily_sales`` from every booking; returns the rows written.
+    
+    On PostgreSQL the table stays locked against incremental updates until
+    the rebuild commits, so bookings made meanwhile are neither lost nor
+    counted twice.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        await db.execute(text(f"LOCK TABLE {SALES.__tablename__} IN EXCLUSIVE MODE"))
+    await db.execute(delete(SALES))
+    
+    cancelled = models.Booking.status == "cancelled"
+    day = _day_of(models.Booking.booking_time, dialect)
+    totals = (
+        select(
+            models.Showtime.movie_id,
+            day,
+            func.count(),
+            func.sum(models.Booking.seats),
+            func.sum(case((cancelled, 1), else_=0)),
+            func.sum(case((cancelled, models.Booking.seats), else_=0))
+        )
+        .join(models.Showtime, models.Booking.showtime_id == models.Showtime.id)
+        # Confirming a hold clears its expiry, so only sales have none
+        .where(models.Booking.hold_expires_at == None)
+        .group_by(models.Showtime.movie_id, day)
+    )
+    await db.execute(insert(SALES).from_select(["movie_id", "day", *SALES_COUNTS], totals))
+    rows = await db.scalar(select(func.count()).select_from(SALES))
+    await db.commit()
+    
+    return rows
+
+def _in_range(query, day_from: Optional[date], day_to: Optional[date], movie_id: Optional[int] = None):
+    if day_from is not None:
+        query = query.filter(SALES.day >= day_from)
+    if day_to is not None:
+        query = query.filter(SALES.day <= day_to)
+    if movie_id is not None:
+        query = query.filter(SALES.movie_id == movie_id)
+    return query
+
+@timed
+async def get_showtime_occupancy(
+    db: AsyncSession,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    movie_id: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None
+):
+    """Return one page of active showtimes with seats sold, ordered by (start_time, id), and the next cursor."""
+    sold = models.Showtime.total_seats - models.Showtime.available_seats
+    query = (
+        select(
+            models.Showtime.id.label("showtime_id"),
+            models.Showtime.movie_id,
+            models.Showtime.auditorium_id,
+            models.Showtime.start_time,
+            models.Showtime.total_seats,
+            sold.label("sold_seats")
+        )
+        .filter(models.Showtime.is_active == True)
+        .order_by(models.Showtime.start_time, models.Showtime.id)
+    )
+    
+    if start_from is not None:
+        query = query.filter(models.Showtime.start_time >= start_from)
+    if start_to is not None:
+        query = query.filter(models.Showtime.start_time < start_to)
+    if movie_id is not None:
+        query = query.filter(models.Showtime.movie_id == movie_id)
+    if cursor is not None:
+        last_start_time, last_id = decode_cursor(cursor, (datetime, int))
+        query = query.filter(
+            tuple_(models.Showtime.start_time, models.Showtime.id) > tuple_(last_start_time, last_id)
+        )
+    
+    limit = min(limit, MAX_PAGE_SIZE)
+    showtimes = as_dicts(await db.execute(query.limit(limit + 1)))
+    
+    next_cursor = None
+    if len(showtimes) > limit:
+        showtimes = showtimes[:limit]
+        next_cursor = encode_cursor((showtimes[-1]["start_time"], showtimes[-1]["showtime_id"]))
+    
+    for showtime in showtimes:
+        showtime["occupancy"] = round(showtime["sold_seats"] / showtime["total_seats"], 4) if showtime["total_seats"] else 0.0
+    
+    return showtimes, next_cursor
+
+@timed
+async def get_movie_daily_sales(
+    db: AsyncSession,
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+    movie_id: Optional[int] = None
+):
+    query = _in_range(
+        select(SALES.movie_id, SALES.day, *(getattr(SALES, name) for name in SALES_COUNTS)),
+        day_from, day_to, movie_id
+    )
+    return as_dicts(await db.execute(query.order_by(SALES.day, SALES.movie_id)))
+
+@timed
+async def get_cancellation_rate(
+    db: AsyncSession,
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+    movie_id: Optional[int] = None
+):
+    query = _in_range(
+        select(
+            func.coalesce(func.sum(SALES.bookings), 0).label("bookings"),
+            func.coalesce(func.sum(SALES.cancelled_bookings), 0).label("cancelled_bookings"),
+            func.coalesce(func.sum(SALES.tickets), 0).label("tickets"),
+            func.coalesce(func.sum(SALES.cancelled_tickets), 0).label("cancelled_tickets")
+        ),
+        day_from, day_to, movie_id
+    )
+    totals = dict((await db.execute(query)).mappings().one())
+    totals["cancellation_rate"] = round(totals["cancelled_bookings"] / totals["bookings"], 4) if totals["bookings"] else 0.0
+    return totals
+
+@timed
+async def get_top_genres(
+    db: AsyncSession,
+    day_from: Optional[date] = None,
+    day_to: Optional[date] = None,
+    limit: int = 10
+):
+    """Genres by tickets sold and not cancelled, best first."""
+    tickets = func.sum(SALES.tickets - SALES.cancelled_tickets).label("tickets")
+    query = _in_range(
+        select(models.Movie.genre, tickets, func.sum(SALES.bookings - SALES.cancelled_bookings).label("bookings"))
+        .join(models.Movie, SALES.movie_id == models.Movie.id)
+        .group_by(models.Movie.genre),
+        day_from, day_to
+    )
+    return as_dicts(await db.execute(query.order_by(desc(tickets), models.Movie.genre).limit(limit)))
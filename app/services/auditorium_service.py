@@ -0,0 +1,81 @@
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from app import models, schemas
+from app.metrics import timed
+
+@timed
+async def create_auditorium(auditorium: schemas.AuditoriumCreate, db: AsyncSession):
+    existing_auditorium = await db.scalar(select(models.Auditorium).filter(
+        models.Auditorium.name == auditorium.name
+    ))
+    
+    if existing_auditorium:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Auditorium with name '{auditorium.name}' already exists"
+        )
+    
+    db_auditorium = models.Auditorium(**auditorium.model_dump())
+    db.add(db_auditorium)
+    await db.commit()
+    await db.refresh(db_auditorium)
+    return db_auditorium
+
+@timed
+async def update_auditorium(auditorium_id: int, auditorium: schemas.AuditoriumCreate, db: AsyncSession):
+    db_auditorium = await db.scalar(select(models.Auditorium).filter(
+        models.Auditorium.id == auditorium_id
+    ))
+    
+    if not db_auditorium:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Auditorium not found"
+        )
+    
+    existing_auditorium = await db.scalar(select(models.Auditorium).filter(
+        models.Auditorium.name == auditorium.name,
+        models.Auditorium.id != auditorium_id
+    ))
+    
+    if existing_auditorium:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Another auditorium with name '{auditorium.name}' already exists"
+        )
+    
+    # Shrinking the room must still fit every active showtime scheduled in it
+    largest_showtime = await db.scalar(select(func.max(models.Showtime.total_seats)).filter(
+        models.Showtime.auditorium_id == auditorium_id,
+        models.Showtime.is_active == True
+    ))
+    
+    if largest_showtime is not None and auditorium.total_seats < largest_showtime:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot reduce seats below those of an active showtime in this auditorium"
+        )
+    
+    for key, value in auditorium.model_dump().items():
+        setattr(db_auditorium, key, value)
+    
+    await db.commit()
+    await db.refresh(db_auditorium)
+    return db_auditorium
+
+@timed
+async def get_auditoriums(db: AsyncSession, is_admin: bool = False):
+    query = select(models.Auditorium)
+    if not is_admin:
+        query = query.filter(models.Auditorium.is_active == True)
+    
+    result = await db.scalars(query.order_by(models.Auditorium.id))
+    return result.all()
+
+@timed
+async def get_auditorium(auditorium_id: int, db: AsyncSession, is_admin: bool = False):
+    query = select(models.Auditorium).filter(models.Auditorium.id == auditorium_id)
+    if not is_admin:
+        query = query.filter(models.Auditorium.is_active == True)
+    return await db.scalar(query)
@@ -1,112 +1,617 @@
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
 from fastapi import HTTPException, status
-from app import models, schemas
-from sqlalchemy.orm import Session
+from app import metrics, models, schemas, seatmap
+from app.availability import availability_hub
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.holds import hold_store
+from app.metrics import timed
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.sequencer import BookingSequencer
+from app.serialization import schema_columns, unprefix
+from app.services.analytics_service import record_sales
+from sqlalchemy import exists, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-def create_booking(booking: schemas.BookingCreate, current_user: models.User, db: Session):
-    showtime = db.query(models.Showtime).filter(
+# Times a seat selection is retried when a concurrent booking changed the map
+SEAT_CLAIM_ATTEMPTS = 5
+
+def _seat_claim(booking: schemas.BookingCreate, now: datetime):
+    # Conditional decrement: only matches while the showtime is bookable and
+    # still has enough seats, so concurrent buyers can never oversell.
+    return (
+        update(models.Showtime)
+        .where(
+            models.Showtime.id == booking.showtime_id,
+            models.Showtime.is_active == True,
+            models.Showtime.end_time >= now,
+            models.Showtime.available_seats >= booking.seats
+        )
+        .values(available_seats=models.Showtime.available_seats - booking.seats)
+        .execution_options(synchronize_session=False)
+    )
+
+async def _booking_failure(booking: schemas.BookingCreate, db: AsyncSession):
+    # Only reached when the conditional update matched nothing, so the extra
+    # read is off the hot path.
+    showtime = await db.scalar(select(models.Showtime).filter(
         models.Showtime.id == booking.showtime_id,
         models.Showtime.is_active == True
-    ).first()
+    ))
     
     if not showtime:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Showtime not found")
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Showtime not found")
     
     current_time = datetime.now(showtime.end_time.tzinfo)
     if current_time > showtime.end_time:
-        raise HTTPException(
+        return HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Cannot book. The showtime has already ended."
         )
-
-    if showtime.available_seats < booking.seats:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="Not enough seats available"
-        )
     
-    db_booking = models.Booking(
-        user_id=current_user.id,
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, 
+        detail="Not enough seats available"
+    )
+
+def _new_booking(booking: schemas.BookingCreate, user_id: int, **fields):
+    return insert(models.Booking).values(
+        user_id=user_id,
         showtime_id=booking.showtime_id,
         seats=booking.seats,
-        status="completed"  
+        seat_numbers=booking.seat_numbers,
+        **fields
+    )
+
+async def _insert_booking(insert_booking, db: AsyncSession):
+    return await db.scalar(
+        select(models.Booking).from_statement(
+            insert_booking.returning(*models.Booking.__table__.c)
+        )
+    )
+
+async def _record_sale(db_booking: models.Booking, db: AsyncSession):
+    # Holds only count as sales once confirmed
+    if db_booking.status == "completed":
+        await record_sales(db, db_booking.showtime_id, db_booking.booking_time, bookings=1, tickets=db_booking.seats)
+
+async def _create_seat_booking(booking: schemas.BookingCreate, user_id: int, db: AsyncSession, **fields):
+    # Optimistic compare-and-swap on the showtime's seat bitmap: the update
+    # only lands if nobody changed the map since we read it, else re-read.
+    wanted = seatmap.mask(booking.seat_numbers)
+    
+    for _ in range(SEAT_CLAIM_ATTEMPTS):
+        showtime = (await db.execute(
+            select(
+                models.Showtime.seat_map,
+                models.Showtime.total_seats,
+                models.Showtime.available_seats,
+                models.Showtime.end_time
+            ).filter(
+                models.Showtime.id == booking.showtime_id,
+                models.Showtime.is_active == True
+            )
+        )).first()
+        
+        if not showtime:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Showtime not found")
+        
+        if booking.seat_numbers[-1] >= showtime.total_seats:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Seat {booking.seat_numbers[-1]} does not exist"
+            )
+        
+        current_time = datetime.now(showtime.end_time.tzinfo)
+        if current_time > showtime.end_time:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, 
+                detail="Cannot book. The showtime has already ended."
+            )
+        
+        current = seatmap.to_int(showtime.seat_map)
+        taken = current & wanted
+        if taken:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Seats already taken: {seatmap.seats_in(taken)}"
+            )
+        
+        if showtime.available_seats < booking.seats:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, 
+                detail="Not enough seats available"
+            )
+        
+        claimed = await db.execute(
+            update(models.Showtime)
+            .where(
+                models.Showtime.id == booking.showtime_id,
+                models.Showtime.seat_map.is_not_distinct_from(showtime.seat_map),
+                models.Showtime.available_seats >= booking.seats
+            )
+            .values(
+                seat_map=seatmap.to_bytes(current | wanted, showtime.total_seats),
+                available_seats=models.Showtime.available_seats - booking.seats
+            )
+            .execution_options(synchronize_session=False)
+        )
+        
+        if claimed.rowcount == 1:
+            db_booking = await _insert_booking(_new_booking(booking, user_id, **fields), db)
+            await _record_sale(db_booking, db)
+            await db.commit()
+            availability_hub.notify(booking.showtime_id)
+            return db_booking
+        
+        await db.rollback()
+    
+    raise HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Seats for this showtime are changing quickly, please try again"
     )
+
+async def _claim_and_insert(booking: schemas.BookingCreate, user_id: int, db: AsyncSession, **fields):
+    if booking.seat_numbers is not None:
+        return await _create_seat_booking(booking, user_id, db, **fields)
     
-    showtime.available_seats -= booking.seats
+    claim = _seat_claim(booking, datetime.now(timezone.utc))
     
-    db.add(db_booking)
-    db.commit()
-    db.refresh(db_booking)
+    if db.bind.dialect.name == "postgresql":
+        # Claim the seats and insert the booking in a single statement
+        claimed = claim.returning(models.Showtime.id.label("showtime_id")).cte("claimed")
+        insert_booking = insert(models.Booking).from_select(
+            ["user_id", "showtime_id", "seats", *fields],
+            select(
+                literal(user_id),
+                claimed.c.showtime_id,
+                literal(booking.seats),
+                *(literal(value, models.Booking.__table__.c[key].type) for key, value in fields.items())
+            )
+        )
+    else:
+        if (await db.execute(claim)).rowcount != 1:
+            await db.rollback()
+            raise await _booking_failure(booking, db)
+        
+        insert_booking = _new_booking(booking, user_id, **fields)
+    
+    db_booking = await _insert_booking(insert_booking, db)
+    
+    if db_booking is None:
+        await db.rollback()
+        raise await _booking_failure(booking, db)
+    
+    await _record_sale(db_booking, db)
+    await db.commit()
+    availability_hub.notify(booking.showtime_id)
     
     return db_booking
 
-def get_user_bookings(db: Session, current_user: models.User, is_admin: bool = False):
-    if is_admin:
-        bookings = db.query(models.Booking).all()
-    else:
-        bookings = db.query(models.Booking).filter(
-            models.Booking.user_id == current_user.id
-        ).all()
+async def _apply_booking_batch(showtime_id: int, requests: List[Tuple[schemas.BookingCreate, int]]):
+    """Settle a queue of (booking, user_id) for one showtime in a single commit.
+    
+    Returns, in order, the new Booking or the HTTPException for each request.
+    """
+    async with AsyncSessionLocal() as db:
+        for _ in range(SEAT_CLAIM_ATTEMPTS):
+            showtime = (await db.execute(
+                select(models.Showtime.available_seats, models.Showtime.end_time)
+                .filter(models.Showtime.id == showtime_id, models.Showtime.is_active == True)
+                .with_for_update()
+            )).first()
+            
+            if not showtime:
+                return [HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Showtime not found")] * len(requests)
+            
+            current_time = datetime.now(showtime.end_time.tzinfo)
+            if current_time > showtime.end_time:
+                return [HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST, 
+                    detail="Cannot book. The showtime has already ended."
+                )] * len(requests)
+            
+            # First come, first served against the seats left
+            results, accepted, remaining = [], [], showtime.available_seats
+            for booking, user_id in requests:
+                if booking.seats > remaining:
+                    results.append(HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST, 
+                        detail="Not enough seats available"
+                    ))
+                    continue
+                remaining -= booking.seats
+                accepted.append(len(results))
+                results.append({
+                    "user_id": user_id,
+                    "showtime_id": showtime_id,
+                    "seats": booking.seats,
+                    "status": "completed"
+                })
+            
+            if not accepted:
+                return results
+            
+            taken = showtime.available_seats - remaining
+            claimed = await db.execute(
+                update(models.Showtime)
+                .where(
+                    models.Showtime.id == showtime_id,
+                    models.Showtime.is_active == True,
+                    models.Showtime.available_seats >= taken
+                )
+                .values(available_seats=models.Showtime.available_seats - taken)
+                .execution_options(synchronize_session=False)
+            )
+            
+            if claimed.rowcount != 1:
+                # Without row locks (SQLite) a direct booking may have got in between
+                await db.rollback()
+                continue
+            
+            bookings = (await db.scalars(
+                insert(models.Booking).returning(models.Booking, sort_by_parameter_order=True),
+                [results[index] for index in accepted]
+            )).all()
+            await record_sales(db, showtime_id, bookings[0].booking_time, bookings=len(bookings), tickets=taken)
+            await db.commit()
+            availability_hub.notify(showtime_id)
+            
+            for index, db_booking in zip(accepted, bookings):
+                results[index] = db_booking
+            return results
     
-    return bookings
+    return [HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Seats for this showtime are changing quickly, please try again"
+    )] * len(requests)
 
-from datetime import datetime, timedelta
+booking_sequencer = BookingSequencer(
+    _apply_booking_batch,
+    enabled=settings.BOOKING_SEQUENCER_ENABLED,
+    threshold=settings.BOOKING_SEQUENCER_THRESHOLD,
+    max_batch=settings.BOOKING_SEQUENCER_MAX_BATCH,
+    idle_seconds=settings.BOOKING_SEQUENCER_IDLE_SECONDS
+)
 
-def cancel_booking(booking_id: int, current_user: models.User, db: Session):
-    booking = db.query(models.Booking).filter(
+# Booking failures by the detail they are raised with, for the outcome metric
+BOOKING_OUTCOMES = {
+    "Not enough seats available": "sold_out",
+    "Cannot book. The showtime has already ended.": "ended",
+    "Showtime not found": "not_found",
+}
+
+async def _counted(kind: str, attempt):
+    try:
+        result = await attempt
+    except HTTPException as exc:
+        outcome = BOOKING_OUTCOMES.get(exc.detail, "conflict" if exc.status_code == status.HTTP_409_CONFLICT else "rejected")
+        metrics.bookings.inc(kind, outcome)
+        raise
+    metrics.bookings.inc(kind, "success")
+    return result
+
+@timed
+async def create_booking(booking: schemas.BookingCreate, current_user: models.User, db: AsyncSession):
+    # Specific seats keep their compare-and-swap path; only counted seats batch
+    if booking.seat_numbers is None and booking_sequencer.is_hot(booking.showtime_id):
+        # Hand the connection back while queued; the batch brings its own
+        await db.rollback()
+        return await _counted("purchase", booking_sequencer.submit(booking.showtime_id, (booking, current_user.id)))
+    
+    with booking_sequencer.track(booking.showtime_id):
+        return await _counted("purchase", _claim_and_insert(booking, current_user.id, db, status="completed"))
+
+@timed
+async def create_hold(booking: schemas.BookingCreate, current_user: models.User, db: AsyncSession):
+    # The seats are claimed now, exactly like a purchase, so the showtime row
+    # is only locked for the length of this one transaction
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=settings.HOLD_TTL_MINUTES)
+    hold = await _counted("hold", _claim_and_insert(
+        booking, current_user.id, db, status="held", hold_expires_at=expires_at
+    ))
+    await hold_store.add(hold.id, expires_at.timestamp())
+    return hold
+
+async def _hold_failure(hold_id: int, user_id: int, db: AsyncSession):
+    hold = await db.scalar(select(models.Booking).filter(
+        models.Booking.id == hold_id,
+        models.Booking.user_id == user_id
+    ))
+    
+    if not hold:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hold not found")
+    
+    if hold.status == "completed":
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Hold already confirmed")
+    
+    if hold.status == "cancelled":
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Hold was cancelled")
+    
+    if hold.status == "held":
+        showtime = await db.get(models.Showtime, hold.showtime_id)
+        if not showtime.is_active or datetime.now(showtime.end_time.tzinfo) >= showtime.end_time:
+            return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Showtime is no longer available")
+    
+    return HTTPException(status_code=status.HTTP_410_GONE, detail="Hold has expired")
+
+@timed
+async def confirm_hold(hold_id: int, current_user: models.User, db: AsyncSession):
+    user_id = current_user.id
+    
+    now = datetime.now(timezone.utc)
+    # Racing the sweeper is safe: both only act on rows still marked held
+    booking = await db.scalar(
+        select(models.Booking).from_statement(
+            update(models.Booking)
+            .where(
+                models.Booking.id == hold_id,
+                models.Booking.user_id == user_id,
+                models.Booking.status == "held",
+                models.Booking.hold_expires_at > now,
+                # The showtime may have been called off since the seats were held
+                exists().where(
+                    models.Showtime.id == models.Booking.showtime_id,
+                    models.Showtime.is_active == True,
+                    models.Showtime.end_time > now
+                )
+            )
+            .values(status="completed", hold_expires_at=None)
+            .returning(*models.Booking.__table__.c)
+        )
+    )
+    
+    if booking is None:
+        await db.rollback()
+        raise await _hold_failure(hold_id, user_id, db)
+    
+    await record_sales(db, booking.showtime_id, booking.booking_time, bookings=1, tickets=booking.seats)
+    await db.commit()
+    await hold_store.remove(hold_id)
+    
+    return booking
+
+@timed
+async def release_expired_holds(db: AsyncSession, hold_ids: List[int]):
+    """Expire the given holds and hand their seats back; returns how many were released."""
+    expired = (await db.execute(
+        update(models.Booking)
+        .where(models.Booking.id.in_(hold_ids), models.Booking.status == "held")
+        .values(status="expired")
+        .returning(models.Booking.showtime_id, models.Booking.seats, models.Booking.seat_numbers)
+        .execution_options(synchronize_session=False)
+    )).all()
+    
+    seats = defaultdict(int)
+    seat_numbers = defaultdict(list)
+    for hold in expired:
+        seats[hold.showtime_id] += hold.seats
+        seat_numbers[hold.showtime_id].extend(hold.seat_numbers or ())
+    
+    # One update per showtime, taken in id order so concurrent sweeps cannot deadlock
+    for showtime_id in sorted(seats):
+        await db.execute(
+            update(models.Showtime)
+            .where(models.Showtime.id == showtime_id)
+            .values(available_seats=models.Showtime.available_seats + seats[showtime_id])
+            .execution_options(synchronize_session=False)
+        )
+        if seat_numbers[showtime_id]:
+            await _release_seat_numbers(showtime_id, seat_numbers[showtime_id], db)
+    
+    await db.commit()
+    for showtime_id in seats:
+        availability_hub.notify(showtime_id)
+    
+    return len(expired)
+
+@timed
+async def recover_holds(db: AsyncSession, store):
+    """Reschedule every outstanding hold, e.g. after an in-process store was lost on restart."""
+    holds = (await db.execute(
+        select(models.Booking.id, models.Booking.hold_expires_at)
+        .filter(models.Booking.status == "held")
+    )).all()
+    
+    for hold in holds:
+        expires_at = hold.hold_expires_at
+        # SQLite hands timestamps back without their offset; they are stored as UTC
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        await store.add(hold.id, expires_at.timestamp())
+    
+    return len(holds)
+
+BOOKING_COLUMNS = schema_columns(schemas.Booking, models.Booking)
+BOOKING_SHOWTIME_COLUMNS = schema_columns(schemas.Showtime, models.Showtime, "showtime__")
+BOOKING_MOVIE_COLUMNS = schema_columns(schemas.Movie, models.Movie, "movie__")
+
+def _booking_with_details(row):
+    booking = unprefix(row, schemas.Booking, models.Booking, "")
+    booking["showtime"] = unprefix(row, schemas.Showtime, models.Showtime, "showtime__")
+    booking["showtime"]["movie"] = unprefix(row, schemas.Movie, models.Movie, "movie__")
+    return booking
+
+@timed
+async def get_user_bookings(
+    db: AsyncSession,
+    current_user: models.User,
+    is_admin: bool = False,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    booking_status: Optional[str] = None,
+    showtime_id: Optional[int] = None,
+    booked_from: Optional[datetime] = None,
+    booked_to: Optional[datetime] = None
+):
+    """Return one page of bookings with their showtime and movie, newest first, and the cursor for the next.
+    
+    Showtime and movie are joined into the same query, so a page costs a
+    single round trip however many rows it holds. Rows come back as plain
+    dicts in the ``BookingWithDetails`` shape, ready for the fast JSON path.
+    """
+    query = (
+        select(*BOOKING_COLUMNS, *BOOKING_SHOWTIME_COLUMNS, *BOOKING_MOVIE_COLUMNS)
+        .join(models.Showtime, models.Booking.showtime_id == models.Showtime.id)
+        .join(models.Movie, models.Showtime.movie_id == models.Movie.id)
+    )
+    
+    if not is_admin:
+        query = query.filter(models.Booking.user_id == current_user.id)
+    if booking_status is not None:
+        query = query.filter(models.Booking.status == booking_status)
+    if showtime_id is not None:
+        query = query.filter(models.Booking.showtime_id == showtime_id)
+    if booked_from is not None:
+        query = query.filter(models.Booking.booking_time >= booked_from)
+    if booked_to is not None:
+        query = query.filter(models.Booking.booking_time < booked_to)
+    
+    # Ids are handed out in booking order, so they double as the keyset
+    if cursor is not None:
+        last_id, = decode_cursor(cursor, (int,))
+        query = query.filter(models.Booking.id < last_id)
+    
+    limit = min(limit, MAX_PAGE_SIZE)
+    rows = (await db.execute(
+        query.order_by(models.Booking.id.desc()).limit(limit + 1)
+    )).mappings().all()
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor((rows[-1]["id"],))
+    
+    return [_booking_with_details(row) for row in rows], next_cursor
+
+async def _cancellation_failure(booking_id: int, user_id: int, db: AsyncSession):
+    booking = await db.scalar(select(models.Booking).filter(
         models.Booking.id == booking_id,
-        models.Booking.user_id == current_user.id
-    ).first()
+        models.Booking.user_id == user_id
+    ))
     
     if not booking:
-        raise HTTPException(
+        return HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="You can cancel only your own bookings"
         )
     
     if booking.status == "cancelled":
-        raise HTTPException(
+        return HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, 
             detail="Booking already cancelled"
         )
     
-    # Get the related showtime
-    showtime = db.query(models.Showtime).filter(
-        models.Showtime.id == booking.showtime_id
-    ).first()
-    
-    if not showtime:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, 
-            detail="Showtime not found"
+    if booking.status == "expired":
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Hold already expired"
         )
     
-    # Check if showtime is about to start within 30 minutes
-    current_time = datetime.now(showtime.start_time.tzinfo)  # Handle timezone awareness
-    time_until_showtime = showtime.start_time - current_time
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST, 
+        detail="Cannot cancel booking. The showtime starts in less than 30 minutes."
+    )
+
+async def _release_seat_numbers(showtime_id: int, seat_numbers: List[int], db: AsyncSession):
+    # The seat counter was just updated in this transaction, so we already
+    # hold the showtime's row lock and the map cannot change underneath us
+    showtime = (await db.execute(
+        select(models.Showtime.seat_map, models.Showtime.total_seats)
+        .filter(models.Showtime.id == showtime_id)
+    )).first()
+    
+    remaining = seatmap.to_int(showtime.seat_map) & ~seatmap.mask(seat_numbers)
+    await db.execute(
+        update(models.Showtime)
+        .where(models.Showtime.id == showtime_id)
+        .values(seat_map=seatmap.to_bytes(remaining, showtime.total_seats))
+        .execution_options(synchronize_session=False)
+    )
+
+@timed
+async def cancel_booking(booking_id: int, current_user: models.User, db: AsyncSession):
+    # Bookings can only be cancelled up to 30 minutes before the showtime starts
+    cutoff = datetime.now(timezone.utc) + timedelta(minutes=30)
+    # Rolling back on failure expires current_user, so keep its id at hand
+    user_id = current_user.id
     
-    if time_until_showtime <= timedelta(minutes=30):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, 
-            detail="Cannot cancel booking. The showtime starts in less than 30 minutes."
+    cancel = (
+        update(models.Booking)
+        .where(
+            models.Booking.id == booking_id,
+            models.Booking.user_id == user_id,
+            models.Booking.status.in_(("completed", "held")),
+            models.Booking.showtime_id.in_(
+                select(models.Showtime.id).where(models.Showtime.start_time > cutoff)
+            )
+        )
+        .values(status="cancelled")
+        .returning(
+            models.Booking.showtime_id,
+            models.Booking.seats,
+            models.Booking.seat_numbers,
+            models.Booking.booking_time,
+            models.Booking.hold_expires_at
         )
+        .execution_options(synchronize_session=False)
+    )
     
-    # Proceed with cancellation
-    booking.status = "cancelled"
+    if db.bind.dialect.name == "postgresql":
+        # Flip the booking and return its seats in a single statement
+        cancelled = cancel.cte("cancelled")
+        released = (await db.execute(
+            update(models.Showtime)
+            .where(models.Showtime.id == cancelled.c.showtime_id)
+            .values(available_seats=models.Showtime.available_seats + cancelled.c.seats)
+            .returning(
+                models.Showtime.id.label("showtime_id"),
+                cancelled.c.seats,
+                cancelled.c.seat_numbers,
+                cancelled.c.booking_time,
+                cancelled.c.hold_expires_at
+            )
+            .execution_options(synchronize_session=False)
+        )).first()
+    else:
+        released = (await db.execute(cancel)).first()
+        if released is not None:
+            await db.execute(
+                update(models.Showtime)
+                .where(models.Showtime.id == released.showtime_id)
+                .values(available_seats=models.Showtime.available_seats + released.seats)
+                .execution_options(synchronize_session=False)
+            )
     
-    # Return seats to available seats
-    showtime.available_seats += booking.seats
+    if released is None:
+        await db.rollback()
+        raise await _cancellation_failure(booking_id, user_id, db)
+    
+    if released.seat_numbers:
+        await _release_seat_numbers(released.showtime_id, released.seat_numbers, db)
+    
+    # A cancelled hold was never counted as a sale
+    if released.hold_expires_at is None:
+        await record_sales(
+            db, released.showtime_id, released.booking_time,
+            cancelled_bookings=1, cancelled_tickets=released.seats
+        )
     
-    db.commit()
+    await db.commit()
+    await hold_store.remove(booking_id)
+    availability_hub.notify(released.showtime_id)
     
     return {"message": "Booking cancelled successfully"}
 
-def delete_booking(booking_id: int, current_user: models.User, db: Session):
+@timed
+async def delete_booking(booking_id: int, current_user: models.User, db: AsyncSession):
     # Get the booking
-    booking = db.query(models.Booking).filter(
+    booking = await db.scalar(select(models.Booking).filter(
         models.Booking.id == booking_id,
         models.Booking.user_id == current_user.id
-    ).first()
+    ))
     
     if not booking:
         raise HTTPException(
@@ -114,9 +619,9 @@ def delete_booking(booking_id: int, current_user: models.User, db: Session):
             detail="You can only delete your own bookings"
         )
     
-    showtime = db.query(models.Showtime).filter(
+    showtime = await db.scalar(select(models.Showtime).filter(
         models.Showtime.id == booking.showtime_id
-    ).first()
+    ))
     
     if not showtime:
         raise HTTPException(
@@ -124,6 +629,12 @@ def delete_booking(booking_id: int, current_user: models.User, db: Session):
             detail="Showtime not found"
         )
     
+    if booking.status == "held":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Cannot delete a held booking. Cancel it first."
+        )
+    
     if booking.status == "completed":
         current_time = datetime.now(showtime.end_time.tzinfo)
         if showtime.end_time > current_time:
@@ -132,7 +643,20 @@ def delete_booking(booking_id: int, current_user: models.User, db: Session):
                 detail="Cannot delete booking. The showtime has not yet completed."
             )
     
-    db.delete(booking)
-    db.commit()
+    await db.delete(booking)
+    await db.flush()
+    
+    # Take the booking back out of the sales it was counted in
+    if booking.hold_expires_at is None:
+        cancelled = booking.status == "cancelled"
+        await record_sales(
+            db, booking.showtime_id, booking.booking_time,
+            bookings=-1,
+            tickets=-booking.seats,
+            cancelled_bookings=-1 if cancelled else 0,
+            cancelled_tickets=-booking.seats if cancelled else 0
+        )
+    
+    await db.commit()
     
     return {"message": "Booking deleted successfully"}
\ No newline at end of file
@@ -1,31 +1,47 @@
+from typing import Optional
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, literal, literal_column, or_, select
+from sqlalchemy.exc import IntegrityError
 from app import models, schemas
+from app.catalog import catalog_cache
+from app.database import violated_constraint
+from app.metrics import timed
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, estimate_count
+from app.search import movie_search_index, tokenize
+from app.serialization import as_dicts, schema_columns
 
-def create_movie(movie: schemas.MovieCreate, db: Session):
-    existing_movie = db.query(models.Movie).filter(
-        models.Movie.title.ilike(movie.title),
-        models.Movie.is_active == True
-    ).first()
-    
-    if existing_movie:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Movie with title '{movie.title}' already exists"
-        )
-    
+MOVIE_COLUMNS = schema_columns(schemas.Movie, models.Movie)
+
+async def _commit_movie(db: AsyncSession, conflict_detail: str):
+    # The unique index on lower(title) over active movies decides, so
+    # concurrent writes cannot both get through
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if violated_constraint(exc) == models.MOVIE_TITLE_UNIQUE:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=conflict_detail
+            )
+        raise
+    await catalog_cache.invalidate()
+
+@timed
+async def create_movie(movie: schemas.MovieCreate, db: AsyncSession):
     db_movie = models.Movie(**movie.model_dump())
     db.add(db_movie)
-    db.commit()
-    db.refresh(db_movie)
+    await _commit_movie(db, f"Movie with title '{movie.title}' already exists")
+    await db.refresh(db_movie)
     return db_movie
 
-def update_movie(movie_id: int, movie: schemas.MovieCreate, db: Session):
-    db_movie = db.query(models.Movie).filter(
+@timed
+async def update_movie(movie_id: int, movie: schemas.MovieCreate, db: AsyncSession):
+    db_movie = await db.scalar(select(models.Movie).filter(
         models.Movie.id == movie_id,
         models.Movie.is_active == True
-    ).first()
+    ))
     
     if not db_movie:
         raise HTTPException(
@@ -33,43 +49,148 @@ def update_movie(movie_id: int, movie: schemas.MovieCreate, db: Session):
             detail="Movie not found"
         )
     
-    existing_movie = db.query(models.Movie).filter(
-        models.Movie.title.ilike(movie.title),
-        models.Movie.id != movie_id,
-        models.Movie.is_active == True
-    ).first()
-    
-    if existing_movie:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail=f"Another movie with title '{movie.title}' already exists"
-        )
-    
     for key, value in movie.model_dump().items():
         setattr(db_movie, key, value)
     
-    db.commit()
-    db.refresh(db_movie)
+    await _commit_movie(db, f"Another movie with title '{movie.title}' already exists")
+    await db.refresh(db_movie)
     return db_movie
 
-def get_movies(db: Session, skip: int = 0, limit: int = 100, is_admin: bool = False):
-    query = db.query(models.Movie)
+def _movies_query(is_admin: bool = False):
+    query = select(models.Movie)
     if not is_admin:
         query = query.filter(models.Movie.is_active == True)
+    return query
+
+@timed
+async def get_movies(
+    db: AsyncSession,
+    skip: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    is_admin: bool = False,
+    cursor: Optional[str] = None
+):
+    """Return one page of movies ordered by id, and the cursor for the next.
+    
+    ``skip`` selects the deprecated offset pagination, which returns no cursor.
+    Pages are served from the catalog cache.
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+    return await catalog_cache.fetch(
+        ("movies", is_admin, skip, limit, cursor),
+        lambda: _load_movies(db, skip, limit, is_admin, cursor)
+    )
+
+async def _load_movies(db: AsyncSession, skip: Optional[int], limit: int, is_admin: bool, cursor: Optional[str]):
+    query = _movies_query(is_admin).with_only_columns(*MOVIE_COLUMNS).order_by(models.Movie.id)
+    
+    if skip is not None:
+        return as_dicts(await db.execute(query.offset(skip).limit(limit))), None
+    
+    if cursor is not None:
+        last_id, = decode_cursor(cursor, (int,))
+        query = query.filter(models.Movie.id > last_id)
     
-    return query.offset(skip).limit(limit).all()
+    movies = as_dicts(await db.execute(query.limit(limit + 1)))
+    
+    next_cursor = None
+    if len(movies) > limit:
+        movies = movies[:limit]
+        next_cursor = encode_cursor((movies[-1]["id"],))
+    
+    return movies, next_cursor
+
+@timed
+async def search_movies(query: str, db: AsyncSession, limit: int = DEFAULT_PAGE_SIZE, is_admin: bool = False):
+    """Movies matching every word of ``query`` in their title, genre or description, best first."""
+    limit = min(limit, MAX_PAGE_SIZE)
+    return await catalog_cache.fetch(
+        ("search", is_admin, query, limit),
+        lambda: _search_movies(query, db, limit, is_admin)
+    )
 
-def get_movie(movie_id: int, db: Session, is_admin: bool = False):
-    query = db.query(models.Movie).filter(models.Movie.id == movie_id)
+async def _search_movies(query: str, db: AsyncSession, limit: int, is_admin: bool):
+    if db.bind.dialect.name == "postgresql":
+        # Spelled exactly as in the index so the planner can use it
+        document = literal_column(f"({models.MOVIE_SEARCH_DOCUMENT})")
+        tsquery = func.websearch_to_tsquery("english", query)
+        return as_dicts(await db.execute(
+            _movies_query(is_admin)
+            .with_only_columns(*MOVIE_COLUMNS)
+            .filter(document.op("@@")(tsquery))
+            .order_by(desc(func.ts_rank(document, tsquery)), models.Movie.id)
+            .limit(limit)
+        ))
+    
+    await movie_search_index.refresh(db, await catalog_cache.current_version())
+    ids = movie_search_index.search(query, limit, is_admin)
+    if not ids:
+        return []
+    
+    movies = {
+        movie["id"]: movie
+        for movie in as_dicts(await db.execute(select(*MOVIE_COLUMNS).filter(models.Movie.id.in_(ids))))
+    }
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
+
+@timed
+async def autocomplete_movies(query: str, db: AsyncSession, limit: int = 10, is_admin: bool = False):
+    """Titles completing ``query`` as typed so far, tolerating small typos."""
+    limit = min(limit, MAX_PAGE_SIZE)
+    typed = " ".join(tokenize(query))
+    if not typed:
+        return []
+    return await catalog_cache.fetch(
+        ("autocomplete", is_admin, typed, limit),
+        lambda: _autocomplete_movies(typed, db, limit, is_admin)
+    )
+
+async def _autocomplete_movies(typed: str, db: AsyncSession, limit: int, is_admin: bool):
+    if db.bind.dialect.name == "postgresql":
+        # Both conditions are served by the trigram index on lower(title);
+        # <% matches titles with a word close to what was typed
+        title = func.lower(models.Movie.title)
+        starts_with = title.startswith(typed, autoescape=True)
+        return as_dicts(await db.execute(
+            _movies_query(is_admin)
+            .with_only_columns(models.Movie.id, models.Movie.title)
+            .filter(or_(starts_with, literal(typed).op("<%")(title)))
+            .order_by(
+                starts_with.desc(),
+                desc(func.word_similarity(typed, title)),
+                func.length(models.Movie.title),
+                models.Movie.id
+            )
+            .limit(limit)
+        ))
+    
+    await movie_search_index.refresh(db, await catalog_cache.current_version())
+    return movie_search_index.suggest(typed, limit, is_admin)
+
+@timed
+async def estimate_movies_count(db: AsyncSession, is_admin: bool = False):
+    return await estimate_count(db, _movies_query(is_admin))
+
+@timed
+async def get_movie(movie_id: int, db: AsyncSession, is_admin: bool = False):
+    return await catalog_cache.fetch(
+        ("movie", is_admin, movie_id),
+        lambda: _load_movie(movie_id, db, is_admin)
+    )
+
+async def _load_movie(movie_id: int, db: AsyncSession, is_admin: bool):
+    query = select(*MOVIE_COLUMNS).filter(models.Movie.id == movie_id)
     if not is_admin:
         query = query.filter(models.Movie.is_active == True)
-    return query.first()
+    movie = (await db.execute(query)).mappings().first()
+    return dict(movie) if movie else None
 
-def deactivate_movie(movie_id: int, db: Session):
-    db_movie = db.query(models.Movie).filter(
+@timed
+async def deactivate_movie(movie_id: int, db: AsyncSession):
+    db_movie = await db.scalar(select(models.Movie).filter(
         models.Movie.id == movie_id,
         models.Movie.is_active == True
-    ).first()
+    ))
     
     if not db_movie:
         raise HTTPException(
@@ -78,10 +199,10 @@ def deactivate_movie(movie_id: int, db: Session):
         )
     
     # Check if there are any active showtimes for this movie
-    active_showtimes = db.query(models.Showtime).filter(
+    active_showtimes = await db.scalar(select(models.Showtime).filter(
         models.Showtime.movie_id == movie_id,
         models.Showtime.is_active == True
-    ).first()
+    ).limit(1))
     
     if active_showtimes:
         raise HTTPException(
@@ -90,11 +211,13 @@ def deactivate_movie(movie_id: int, db: Session):
         )
     
     db_movie.is_active = False
-    db.commit()
+    await db.commit()
+    await catalog_cache.invalidate()
     return db_movie
 
-def delete_movie(movie_id: int, db: Session):
-    db_movie = db.query(models.Movie).filter(models.Movie.id == movie_id).first()
+@timed
+async def delete_movie(movie_id: int, db: AsyncSession):
+    db_movie = await db.scalar(select(models.Movie).filter(models.Movie.id == movie_id))
     
     if not db_movie:
         raise HTTPException(
@@ -103,9 +226,9 @@ def delete_movie(movie_id: int, db: Session):
         )
     
     # Check if there are ANY showtimes associated with this movie (active or inactive)
-    any_showtimes = db.query(models.Showtime).filter(
+    any_showtimes = await db.scalar(select(models.Showtime).filter(
         models.Showtime.movie_id == movie_id
-    ).first()
+    ).limit(1))
     
     if any_showtimes:
         raise HTTPException(
@@ -113,6 +236,7 @@ def delete_movie(movie_id: int, db: Session):
             detail="Cannot delete movie. There are showtimes associated with this movie."
         )
     
-    db.delete(db_movie)
-    db.commit()
-    return db_movie
\ No newline at end of file
+    await db.delete(db_movie)
+    await db.commit()
+    await catalog_cache.invalidate()
+    return db_movie
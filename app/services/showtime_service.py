@@ -1,76 +1,279 @@
+import base64
 from typing import Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, exists, insert, or_, select, tuple_
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from datetime import datetime, timedelta
-from app import models, schemas
+from datetime import datetime, timedelta, timezone
+from heapq import heappop, heappush
+from app import models, schemas, seatmap
+from app.availability import availability_hub
+from app.catalog import catalog_cache, normalize
+from app.database import violated_constraint
+from app.metrics import timed
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, estimate_count
+from app.serialization import as_dicts, schema_columns
 
-def create_showtime(showtime_data: schemas.ShowtimeCreate, db: Session):
-    movie = db.query(models.Movie).filter(
+SHOWTIME_COLUMNS = schema_columns(schemas.Showtime, models.Showtime)
+
+# Exclusion constraint backing the overlap check on PostgreSQL
+NO_OVERLAP_CONSTRAINT = "ex_showtimes_auditorium_no_overlap"
+
+def _overlap_error():
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="A showtime already exists in this auditorium at that timeframe"
+    )
+
+async def _get_schedulable(showtime_data: schemas.ShowtimeCreate, db: AsyncSession):
+    movie = await db.scalar(select(models.Movie).filter(
         models.Movie.id == showtime_data.movie_id,
         models.Movie.is_active == True
-    ).first()
+    ))
     
     if not movie:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Movie not found")
     
-    end_time = showtime_data.start_time + timedelta(minutes=movie.duration)
+    auditorium = await db.scalar(select(models.Auditorium).filter(
+        models.Auditorium.id == showtime_data.auditorium_id,
+        models.Auditorium.is_active == True
+    ))
     
-    # Check for overlapping showtimes
-    overlapping_showtime = db.query(models.Showtime).filter(
-        or_(
-            # New showtime starts during an existing showtime
-            and_(
-                showtime_data.start_time >= models.Showtime.start_time,
-                showtime_data.start_time < models.Showtime.end_time
-            ),
-            # New showtime ends during an existing showtime
-            and_(
-                end_time > models.Showtime.start_time,
-                end_time <= models.Showtime.end_time
-            ),
-            # New showtime completely overlaps an existing showtime
-            and_(
-                showtime_data.start_time <= models.Showtime.start_time,
-                end_time >= models.Showtime.end_time
-            )
-        )
-    ).first()
+    if not auditorium:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Auditorium not found")
     
-    if overlapping_showtime:
+    if showtime_data.total_seats > auditorium.total_seats:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"A showtime already exists from at that timeframe"
+            detail=f"Total seats cannot exceed the auditorium's {auditorium.total_seats} seats"
         )
     
+    return movie, auditorium
+
+async def _find_overlapping_showtime(
+    db: AsyncSession,
+    auditorium_id: int,
+    start_time: datetime,
+    end_time: datetime,
+    exclude_id: Optional[int] = None
+):
+    # Active showtimes in one auditorium never overlap each other, so the
+    # only candidate is the latest one starting before end_time: a single
+    # index seek on (auditorium_id, start_time) however long the schedule is.
+    latest_before_end = select(models.Showtime.id).filter(
+        models.Showtime.auditorium_id == auditorium_id,
+        models.Showtime.is_active == True,
+        models.Showtime.start_time < end_time
+    )
+    if exclude_id is not None:
+        latest_before_end = latest_before_end.filter(models.Showtime.id != exclude_id)
+    latest_before_end = latest_before_end.order_by(models.Showtime.start_time.desc()).limit(1)
+    
+    return await db.scalar(select(models.Showtime).filter(
+        models.Showtime.id == latest_before_end.scalar_subquery(),
+        models.Showtime.end_time > start_time
+    ))
+
+def _as_utc(value: datetime):
+    # SQLite hands timestamps back without their offset; they are stored as UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+def _overlap_detail(entry):
+    _, kind, _, ref = entry
+    if kind == 0:
+        return f"Overlaps showtime {ref} in this auditorium"
+    return f"Overlaps item {ref} of this batch in the same auditorium"
+
+async def _commit_schedule(db: AsyncSession):
+    try:
+        await db.commit()
+    except IntegrityError as exc:
+        await db.rollback()
+        if violated_constraint(exc) == NO_OVERLAP_CONSTRAINT:
+            raise _overlap_error()
+        raise
+    await catalog_cache.invalidate()
+
+@timed
+async def create_showtime(showtime_data: schemas.ShowtimeCreate, db: AsyncSession):
+    movie, auditorium = await _get_schedulable(showtime_data, db)
+    
+    end_time = showtime_data.start_time + timedelta(minutes=movie.duration)
+    
+    # Check for overlapping showtimes in the same auditorium
+    if await _find_overlapping_showtime(db, auditorium.id, showtime_data.start_time, end_time):
+        raise _overlap_error()
+    
     # Create the showtime
     db_showtime = models.Showtime(
         **showtime_data.model_dump(),
         end_time=end_time,
-        available_seats=showtime_data.total_seats
+        available_seats=showtime_data.total_seats,
+        seat_map=seatmap.empty(showtime_data.total_seats)
     )
     
     db.add(db_showtime)
-    db.commit()
-    db.refresh(db_showtime)
+    await _commit_schedule(db)
+    await db.refresh(db_showtime)
     return db_showtime
 
-def update_showtime(showtime_id: int, showtime_data: schemas.ShowtimeCreate, db: Session):
-    db_showtime = db.query(models.Showtime).filter(models.Showtime.id == showtime_id).first()
+@timed
+async def create_showtimes_bulk(batch: schemas.ShowtimeBulkCreate, db: AsyncSession):
+    """Schedule a whole batch in one transaction, reporting a result per item.
+    
+    Movies and auditoriums are looked up once for the batch, and overlaps are
+    found with sorted sweeps per auditorium: first the batch against the rows
+    already scheduled in its time window, then the items left against each
+    other. Items that conflict are skipped; the rest go in with a single
+    multi-row insert.
+    """
+    items = batch.showtimes
+    errors = {}
+    
+    movie_ids = {item.movie_id for item in items}
+    durations = dict((await db.execute(
+        select(models.Movie.id, models.Movie.duration).filter(
+            models.Movie.id.in_(movie_ids),
+            models.Movie.is_active == True
+        )
+    )).all())
+    
+    auditorium_ids = {item.auditorium_id for item in items}
+    capacities = dict((await db.execute(
+        select(models.Auditorium.id, models.Auditorium.total_seats).filter(
+            models.Auditorium.id.in_(auditorium_ids),
+            models.Auditorium.is_active == True
+        )
+    )).all())
+    
+    end_times = {}
+    for index, item in enumerate(items):
+        if item.movie_id not in durations:
+            errors[index] = "Movie not found"
+        elif item.auditorium_id not in capacities:
+            errors[index] = "Auditorium not found"
+        elif item.total_seats > capacities[item.auditorium_id]:
+            errors[index] = f"Total seats cannot exceed the auditorium's {capacities[item.auditorium_id]} seats"
+        else:
+            end_times[index] = item.start_time + timedelta(minutes=durations[item.movie_id])
+    
+    if end_times:
+        window_start = min(items[index].start_time for index in end_times)
+        window_end = max(end_times.values())
+        existing = (await db.execute(
+            select(
+                models.Showtime.id,
+                models.Showtime.auditorium_id,
+                models.Showtime.start_time,
+                models.Showtime.end_time
+            ).filter(
+                models.Showtime.auditorium_id.in_({items[index].auditorium_id for index in end_times}),
+                models.Showtime.is_active == True,
+                models.Showtime.start_time < window_end,
+                models.Showtime.end_time > window_start
+            )
+        )).all()
+        
+        # (start, kind, end, ref) with kind 0 for stored rows, 1 for batch items
+        timelines = {}
+        for row in existing:
+            timelines.setdefault(row.auditorium_id, []).append(
+                (_as_utc(row.start_time), 0, _as_utc(row.end_time), row.id)
+            )
+        for index, end_time in end_times.items():
+            item = items[index]
+            timelines.setdefault(item.auditorium_id, []).append((item.start_time, 1, end_time, index))
+        
+        for timeline in timelines.values():
+            timeline.sort()
+            # Stored rows cannot move, so every item meeting one yields first;
+            # open_items holds the items that may still run into the next one
+            stored_last = None
+            open_items = []
+            for entry in timeline:
+                start_time, kind, end_time, ref = entry
+                if kind == 0:
+                    while open_items and open_items[0][0] <= start_time:
+                        heappop(open_items)
+                    for _, item_entry in open_items:
+                        errors[item_entry[3]] = _overlap_detail(entry)
+                    open_items.clear()
+                    if stored_last is None or end_time > stored_last[2]:
+                        stored_last = entry
+                elif stored_last is not None and start_time < stored_last[2]:
+                    errors[ref] = _overlap_detail(stored_last)
+                else:
+                    heappush(open_items, (end_time, entry))
+            
+            # Then the survivors among themselves: the earliest start wins
+            last = None
+            for entry in timeline:
+                if entry[1] == 0 or entry[3] in errors:
+                    continue
+                if last is not None and entry[0] < last[2]:
+                    errors[entry[3]] = _overlap_detail(last)
+                    continue
+                last = entry
+    
+    valid = [index for index in range(len(items)) if index not in errors]
+    created = {}
+    if valid:
+        rows = [
+            {
+                **items[index].model_dump(),
+                "end_time": end_times[index],
+                "available_seats": items[index].total_seats,
+                "seat_map": seatmap.empty(items[index].total_seats)
+            }
+            for index in valid
+        ]
+        showtimes = (await db.scalars(
+            insert(models.Showtime).returning(models.Showtime, sort_by_parameter_order=True),
+            rows
+        )).all()
+        await _commit_schedule(db)
+        created = dict(zip(valid, showtimes))
+    
+    return schemas.ShowtimeBulkResult(
+        created=len(created),
+        failed=len(errors),
+        results=[
+            schemas.ShowtimeBulkItem(index=index, showtime=created.get(index), error=errors.get(index))
+            for index in range(len(items))
+        ]
+    )
+
+@timed
+async def update_showtime(showtime_id: int, showtime_data: schemas.ShowtimeCreate, db: AsyncSession):
+    # Lock the row so bookings cannot change the seat counts or map while we
+    # recompute them
+    db_showtime = await db.scalar(
+        select(models.Showtime).filter(models.Showtime.id == showtime_id).with_for_update()
+    )
     
     if not db_showtime:
         raise HTTPException(status_code=404, detail="Showtime not found")
     
-    movie = db.query(models.Movie).filter(
-        models.Movie.id == showtime_data.movie_id,
-        models.Movie.is_active == True
-    ).first()
+    # Sales are summed per movie as they happen (see analytics_service), so
+    # moving booked seats to another movie would split them between the two
+    if showtime_data.movie_id != db_showtime.movie_id and await db.scalar(select(exists().where(
+        models.Booking.showtime_id == showtime_id,
+        models.Booking.status != "expired"
+    ))):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Cannot change the movie of a showtime that has bookings"
+        )
     
-    if not movie:
-        raise HTTPException(status_code=404, detail="Movie not found")
+    movie, auditorium = await _get_schedulable(showtime_data, db)
     
     end_time = showtime_data.start_time + timedelta(minutes=movie.duration)
     
+    if db_showtime.is_active and await _find_overlapping_showtime(
+        db, auditorium.id, showtime_data.start_time, end_time, exclude_id=showtime_id
+    ):
+        raise _overlap_error()
+    
     # Store original values for comparison
     original_total_seats = db_showtime.total_seats
     original_available_seats = db_showtime.available_seats
@@ -97,34 +300,155 @@ def update_showtime(showtime_id: int, showtime_data: schemas.ShowtimeCreate, db:
                 status_code=400,
                 detail="Cannot reduce total seats below currently booked seats"
             )
+        
+        taken = seatmap.seats_in(seatmap.to_int(db_showtime.seat_map))
+        if taken and taken[-1] >= showtime_data.total_seats:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Cannot remove seat {taken[-1]}, it is already booked"
+            )
+        
+        db_showtime.seat_map = seatmap.to_bytes(
+            seatmap.to_int(db_showtime.seat_map), showtime_data.total_seats
+        )
     
     db_showtime.end_time = end_time
-    db.commit()
-    db.refresh(db_showtime)
+    await _commit_schedule(db)
+    availability_hub.notify(showtime_id)
+    await db.refresh(db_showtime)
     return db_showtime
 
-def get_showtime(db: Session, showtime_id: int, is_admin: bool = False):
-    query = db.query(models.Showtime)
+async def _with_fresh_seats(db: AsyncSession, showtimes: list):
+    # Cached showtimes go stale with every booking, so availability is always
+    # read live: a primary key lookup instead of rebuilding the whole page.
+    # Seat writes bump updated_at too, so it comes along with the seats.
+    if not showtimes:
+        return showtimes
+    
+    rows = (await db.execute(
+        select(models.Showtime.id, models.Showtime.available_seats, models.Showtime.updated_at)
+        .filter(models.Showtime.id.in_([showtime["id"] for showtime in showtimes]))
+    )).all()
+    fresh = {
+        showtime_id: {"available_seats": available_seats, "updated_at": updated_at}
+        for showtime_id, available_seats, updated_at in normalize([tuple(row) for row in rows])
+    }
+    
+    return [{**showtime, **fresh.get(showtime["id"], {})} for showtime in showtimes]
+
+@timed
+async def get_showtime(db: AsyncSession, showtime_id: int, is_admin: bool = False):
+    showtime = await catalog_cache.fetch(
+        ("showtime", is_admin, showtime_id),
+        lambda: _load_showtime(db, showtime_id, is_admin)
+    )
+    
+    if showtime is None:
+        return None
+    
+    showtime, = await _with_fresh_seats(db, [showtime])
+    return showtime
+
+async def _load_showtime(db: AsyncSession, showtime_id: int, is_admin: bool):
+    query = select(*SHOWTIME_COLUMNS)
     
     if not is_admin:
         query = query.filter(
             models.Showtime.is_active == True
         )
     
-    showtime = query.filter(models.Showtime.id == showtime_id).first()
-    return showtime
+    showtime = (await db.execute(query.filter(models.Showtime.id == showtime_id))).mappings().first()
+    return dict(showtime) if showtime else None
 
-def get_all_showtimes(db: Session, skip: int = 0, limit: int = 100, is_admin: bool = False):
-    query = db.query(models.Showtime)
+@timed
+async def get_seat_map(db: AsyncSession, showtime_id: int, is_admin: bool = False):
+    query = (
+        select(models.Showtime, models.Auditorium.seats_per_row)
+        .join(models.Auditorium, models.Showtime.auditorium_id == models.Auditorium.id)
+        .filter(models.Showtime.id == showtime_id)
+    )
     
     if not is_admin:
         query = query.filter(models.Showtime.is_active == True)
     
-    return query.offset(skip).limit(limit).all()
+    row = (await db.execute(query)).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Showtime not found")
+    
+    showtime, seats_per_row = row
+    bits = seatmap.to_int(showtime.seat_map)
+    taken = seatmap.seats_in(bits)
+    
+    return schemas.SeatMap(
+        showtime_id=showtime.id,
+        total_seats=showtime.total_seats,
+        seats_per_row=seats_per_row,
+        available_seats=showtime.available_seats,
+        seat_map=base64.b64encode(seatmap.to_bytes(bits, showtime.total_seats)).decode(),
+        taken_seats=taken,
+        taken_labels=[seatmap.label(seat, seats_per_row) for seat in taken]
+    )
 
+def _showtimes_query(is_admin: bool = False):
+    query = select(models.Showtime)
+    
+    if not is_admin:
+        query = query.filter(models.Showtime.is_active == True)
+    
+    return query
+
+@timed
+async def get_all_showtimes(
+    db: AsyncSession,
+    skip: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    is_admin: bool = False,
+    cursor: Optional[str] = None
+):
+    """Return one page of showtimes ordered by (start_time, id), and the cursor for the next.
+    
+    ``skip`` selects the deprecated offset pagination, which returns no cursor.
+    Pages are served from the catalog cache with live seat availability.
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+    showtimes, next_cursor = await catalog_cache.fetch(
+        ("showtimes", is_admin, skip, limit, cursor),
+        lambda: _load_showtimes(db, skip, limit, is_admin, cursor)
+    )
+    return await _with_fresh_seats(db, showtimes), next_cursor
+
+async def _load_showtimes(db: AsyncSession, skip: Optional[int], limit: int, is_admin: bool, cursor: Optional[str]):
+    query = (
+        _showtimes_query(is_admin)
+        .with_only_columns(*SHOWTIME_COLUMNS)
+        .order_by(models.Showtime.start_time, models.Showtime.id)
+    )
+    
+    if skip is not None:
+        return as_dicts(await db.execute(query.offset(skip).limit(limit))), None
+    
+    if cursor is not None:
+        last_start_time, last_id = decode_cursor(cursor, (datetime, int))
+        query = query.filter(
+            tuple_(models.Showtime.start_time, models.Showtime.id) > tuple_(last_start_time, last_id)
+        )
+    
+    showtimes = as_dicts(await db.execute(query.limit(limit + 1)))
+    
+    next_cursor = None
+    if len(showtimes) > limit:
+        showtimes = showtimes[:limit]
+        next_cursor = encode_cursor((showtimes[-1]["start_time"], showtimes[-1]["id"]))
+    
+    return showtimes, next_cursor
 
-def deactivate_showtime(showtime_id: int, db: Session):
-    db_showtime = db.query(models.Showtime).filter(models.Showtime.id == showtime_id).first()
+@timed
+async def estimate_showtimes_count(db: AsyncSession, is_admin: bool = False):
+    return await estimate_count(db, _showtimes_query(is_admin))
+
+@timed
+async def deactivate_showtime(showtime_id: int, db: AsyncSession):
+    db_showtime = await db.scalar(select(models.Showtime).filter(models.Showtime.id == showtime_id))
     
     if not db_showtime:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Showtime not found")
@@ -133,10 +457,14 @@ def deactivate_showtime(showtime_id: int, db: Session):
     current_time = datetime.now(db_showtime.end_time.tzinfo)
     has_completed = current_time > db_showtime.end_time
     
-    # Check for active bookings (only "completed" status bookings matter for active showtimes)
-    active_booking_exists = any(
-        booking.status == "completed" for booking in db_showtime.bookings
-    )
+    # Check for active bookings: purchases, and holds that can still be confirmed
+    active_booking_exists = await db.scalar(select(exists().where(
+        models.Booking.showtime_id == showtime_id,
+        or_(
+            models.Booking.status == "completed",
+            and_(models.Booking.status == "held", models.Booking.hold_expires_at > datetime.now(timezone.utc))
+        )
+    )))
     
     # Allow deactivation if showtime has completed OR there are no active bookings
     if not has_completed and active_booking_exists:
@@ -146,12 +474,14 @@ def deactivate_showtime(showtime_id: int, db: Session):
         )
 
     db_showtime.is_active = False
-    db.commit()
+    await db.commit()
+    await catalog_cache.invalidate()
     
     return db_showtime
 
-def delete_showtime(showtime_id: int, db: Session):
-    db_showtime = db.query(models.Showtime).filter(models.Showtime.id == showtime_id).first()
+@timed
+async def delete_showtime(showtime_id: int, db: AsyncSession):
+    db_showtime = await db.scalar(select(models.Showtime).filter(models.Showtime.id == showtime_id))
     
     if not db_showtime:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Showtime not found")
@@ -164,18 +494,21 @@ def delete_showtime(showtime_id: int, db: Session):
     is_inactive = not db_showtime.is_active
     
     # Check for any bookings
-    has_any_bookings = bool(db_showtime.bookings)
+    has_any_bookings = await db.scalar(select(exists().where(
+        models.Booking.showtime_id == showtime_id
+    )))
     
     # Allow deletion if:
     # 1. Showtime is inactive OR has completed, AND
     # 2. There are no bookings at all
     if (is_inactive or has_completed) and not has_any_bookings:
         # Safe to delete
-        db.delete(db_showtime)
-        db.commit()
+        await db.delete(db_showtime)
+        await db.commit()
+        await catalog_cache.invalidate()
         return db_showtime
     else:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Cannot delete showtime. It must be either inactive or completed, and have no bookings."
-        )
\ No newline at end of file
+        )
@@ -1,21 +1,25 @@
 from datetime import timedelta
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 
 from app import models, schemas
-from app.auth import get_password_hash, verify_password, create_access_token
+from app.auth import create_access_token
 from app.config import settings
+from app.metrics import timed
+from app.passwords import password_hasher
 
-def create_user(user: schemas.UserCreate, db: Session):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
+@timed
+async def create_user(user: schemas.UserCreate, db: AsyncSession):
+    db_user = await db.scalar(select(models.User).filter(models.User.username == user.username))
     if db_user:
         return None  
 
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+    db_user = await db.scalar(select(models.User).filter(models.User.email == user.email))
     if db_user:
         return None 
     
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await password_hasher.hash(user.password)
     db_user = models.User(
         username=user.username,
         email=user.email,
@@ -24,15 +28,16 @@ def create_user(user: schemas.UserCreate, db: Session):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
-def authenticate_user(username: str, password: str, db: Session):
-    user = db.query(models.User).filter(models.User.username == username).first()
+@timed
+async def authenticate_user(username: str, password: str, db: AsyncSession):
+    user = await db.scalar(select(models.User).filter(models.User.username == username))
     
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await password_hasher.verify(password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
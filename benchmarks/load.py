@@ -0,0 +1,315 @@
+"""Load scenarios against the full API, driven in process through ASGI.
+
+Seeds a throwaway database, runs each scenario with ``--concurrency``
+clients via httpx's ASGI transport (no network, no server), and writes
+throughput, latency percentiles, status counts, queries per request and,
+for the booking scenarios, the oversell count to a JSON file for
+comparison across commits:
+
+    python -m benchmarks.load --output results.json
+    python -m benchmarks.load --scenarios flash_sale --buyers 2000 --sequencer
+
+Scenarios:
+
+- ``flash_sale``: every buyer tries to book the same small showtime at once
+- ``browse``: a catalog read mix (showtime list and detail, movies, seat maps)
+- ``login_storm``: many users logging in together (bcrypt on the worker pool)
+- ``cancel_churn``: users booking and cancelling on one showtime
+
+SQLite in a temp directory by default. Pass ``--database-url`` to use a
+throwaway local PostgreSQL instead; it is wiped and reseeded. Rate limits
+are switched off, since one driver would otherwise throttle itself;
+admission control stays on as deployed.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List
+
+def _configure():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="flash_sale,browse,login_storm,cancel_churn")
+    parser.add_argument("--database-url", help="throwaway database to use instead of a temp SQLite file")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--buyers", type=int, default=1000, help="flash sale booking attempts")
+    parser.add_argument("--flash-seats", type=int, default=300)
+    parser.add_argument("--browse-requests", type=int, default=2000)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--churn-cycles", type=int, default=500)
+    parser.add_argument("--sequencer", action="store_true", help="turn on the booking sequencer")
+    parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load-results.json")
+    args = parser.parse_args()
+    
+    # Settings are read on import, so everything is set before app is loaded
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{tempfile.mkdtemp(prefix='bench_load_')}/bench.db"
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["SCHEMA_CHECK_ON_STARTUP"] = "false"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ["BOOKING_SEQUENCER_ENABLED"] = str(args.sequencer).lower()
+    # The profiler supplies queries per request; nothing counts as slow
+    os.environ["SQL_PROFILER_ENABLED"] = "true"
+    os.environ["SQL_PROFILER_SLOW_QUERY_MS"] = "1e9"
+    return args
+
+ARGS = _configure() if __name__ == "__main__" else None
+
+import httpx
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app import models
+from app.auth import create_access_token
+from app.config import settings
+from app.database import Base
+from app.passwords import get_password_hash
+from app.profiler import sql_profiler
+
+API = settings.API_V1_STR
+PASSWORD = "Bench-passw0rd"
+
+class Seed:
+    def __init__(self, users: List[str], showtime_ids: List[int], movie_ids: List[int], flash_showtime_id: int, churn_showtime_id: int):
+        self.users = users
+        self.showtime_ids = showtime_ids
+        self.movie_ids = movie_ids
+        self.flash_showtime_id = flash_showtime_id
+        self.churn_showtime_id = churn_showtime_id
+
+def seed(engine, args) -> Seed:
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    
+    now = datetime.now(timezone.utc)
+    # One hash for everybody: seeding should not take longer than the run
+    hashed = get_password_hash(PASSWORD)
+    usernames = [f"bench{i}" for i in range(args.users)]
+    with Session(engine) as session:
+        session.execute(insert(models.User), [
+            {"username": name, "email": f"{name}@example.com", "full_name": name, "hashed_password": hashed}
+            for name in usernames
+        ])
+        session.execute(insert(models.Auditorium), [
+            {"name": "Main", "total_seats": 500},
+            {"name": "Flash", "total_seats": args.flash_seats},
+            {"name": "Churn", "total_seats": 100},
+        ])
+        session.execute(insert(models.Movie), [
+            {"title": f"Movie {i}", "description": "A film", "duration": 120, "genre": "Drama"}
+            for i in range(200)
+        ])
+        session.execute(insert(models.Showtime), [
+            {
+                "movie_id": i % 200 + 1,
+                "auditorium_id": 1,
+                "start_time": now + timedelta(days=1, hours=3 * i),
+                "end_time": now + timedelta(days=1, hours=3 * i + 2),
+                "total_seats": 500,
+                "available_seats": 500,
+            }
+            for i in range(500)
+        ])
+        flash_id, churn_id = session.scalars(insert(models.Showtime).returning(models.Showtime.id), [
+            {
+                "movie_id": 1,
+                "auditorium_id": auditorium_id,
+                "start_time": now + timedelta(days=2),
+                "end_time": now + timedelta(days=2, hours=2),
+                "total_seats": seats,
+                "available_seats": seats,
+            }
+            for auditorium_id, seats in ((2, args.flash_seats), (3, 100))
+        ]).all()
+        session.commit()
+        showtime_ids = session.scalars(select(models.Showtime.id).where(models.Showtime.auditorium_id == 1)).all()
+    return Seed(usernames, list(showtime_ids), list(range(1, 201)), flash_id, churn_id)
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+async def drive(calls: List[Callable[[], Awaitable[httpx.Response]]], concurrency: int) -> dict:
+    """Run ``calls`` on ``concurrency`` workers; latency is per call, in milliseconds."""
+    pending = iter(calls)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+
+    async def worker():
+        for call in pending:
+            started = time.perf_counter()
+            response = await call()
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[response.status_code] += 1
+
+    sql_profiler.routes.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    profiled = list(sql_profiler.routes.values())
+    requests = sum(route["requests"] for route in profiled)
+    return {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 2),
+            "p95": round(percentile(latencies, 0.95), 2),
+            "p99": round(percentile(latencies, 0.99), 2),
+            "max": round(latencies[-1], 2) if latencies else 0.0,
+        },
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "queries_per_request": round(sum(route["queries"] for route in profiled) / requests, 2) if requests else 0.0,
+    }
+
+def oversell(engine, showtime_id: int) -> dict:
+    """Seats sold beyond capacity, and whether the counter agrees with the bookings."""
+    with Session(engine) as session:
+        total, available = session.execute(
+            select(models.Showtime.total_seats, models.Showtime.available_seats)
+            .where(models.Showtime.id == showtime_id)
+        ).one()
+        sold = session.scalar(
+            select(func.coalesce(func.sum(models.Booking.seats), 0))
+            .where(models.Booking.showtime_id == showtime_id, models.Booking.status.in_(("completed", "held")))
+        )
+    return {
+        "total_seats": total,
+        "seats_sold": sold,
+        "oversell": max(0, sold - total),
+        "counter_drift": (total - available) - sold,
+    }
+
+def headers_for(username: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}"}
+
+async def flash_sale(client: httpx.AsyncClient, data: Seed, engine, args, rng: random.Random) -> dict:
+    buyers = [headers_for(data.users[i % len(data.users)]) for i in range(args.buyers)]
+    calls = [
+        lambda headers=headers, seats=rng.choice((1, 1, 2)): client.post(
+            f"{API}/bookings", json={"showtime_id": data.flash_showtime_id, "seats": seats}, headers=headers
+        )
+        for headers in buyers
+    ]
+    result = await drive(calls, args.concurrency)
+    result.update(oversell(engine, data.flash_showtime_id))
+    return result
+
+async def browse(client: httpx.AsyncClient, data: Seed, engine, args, rng: random.Random) -> dict:
+    viewers = [headers_for(name) for name in data.users]
+
+    def pick():
+        headers = rng.choice(viewers)
+        roll = rng.random()
+        if roll < 0.4:
+            return lambda: client.get(f"{API}/showtimes", headers=headers)
+        if roll < 0.7:
+            return lambda url=f"{API}/showtimes/{rng.choice(data.showtime_ids)}": client.get(url, headers=headers)
+        if roll < 0.9:
+            return lambda: client.get(f"{API}/movies", headers=headers)
+        return lambda url=f"{API}/showtimes/{rng.choice(data.showtime_ids)}/seats": client.get(url, headers=headers)
+
+    return await drive([pick() for _ in range(args.browse_requests)], args.concurrency)
+
+async def login_storm(client: httpx.AsyncClient, data: Seed, engine, args, rng: random.Random) -> dict:
+    calls = [
+        lambda username=data.users[i % len(data.users)]: client.post(
+            f"{API}/auth/login", data={"username": username, "password": PASSWORD}
+        )
+        for i in range(args.logins)
+    ]
+    return await drive(calls, args.concurrency)
+
+async def cancel_churn(client: httpx.AsyncClient, data: Seed, engine, args, rng: random.Random) -> dict:
+    async def cycle(headers, seats):
+        booked = await client.post(
+            f"{API}/bookings", json={"showtime_id": data.churn_showtime_id, "seats": seats}, headers=headers
+        )
+        if booked.status_code != 200:
+            return booked
+        return await client.patch(f"{API}/bookings/{booked.json()['id']}", headers=headers)
+
+    calls = [
+        lambda headers=headers_for(data.users[i % len(data.users)]), seats=rng.choice((1, 2)): cycle(headers, seats)
+        for i in range(args.churn_cycles)
+    ]
+    result = await drive(calls, args.concurrency)
+    # Every cycle cancels what it booked, so the showtime should end up empty
+    result.update(oversell(engine, data.churn_showtime_id))
+    return result
+
+SCENARIOS = {
+    "flash_sale": flash_sale,
+    "browse": browse,
+    "login_storm": login_storm,
+    "cancel_churn": cancel_churn,
+}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+async def run(args) -> dict:
+    from app.main import app
+    
+    engine = create_engine(args.database_url)
+    data = seed(engine, args)
+    rng = random.Random(args.seed)
+    results = {}
+    async with app.router.lifespan_context(app):
+        # Unhandled errors come back as 500s, as from a real server, instead of stopping the run
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenarios.split(","):
+                print(f"running {name}...", file=sys.stderr)
+                results[name] = await SCENARIOS[name](client, data, engine, args, rng)
+    engine.dispose()
+    return results
+
+def main():
+    args = ARGS
+    results = asyncio.run(run(args))
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "database": args.database_url.split(":", 1)[0],
+        "config": {key: value for key, value in vars(args).items() if key not in ("database_url", "output")},
+        "scenarios": results,
+    }
+    with open(args.output, "w") as output:
+        json.dump(report, output, indent=2)
+    
+    print(f"{'scenario':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'q/req':>8}{'oversell':>10}")
+    for name, result in results.items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<14}{result['throughput_rps']:>10,.1f}{latency['p50']:>10.2f}{latency['p95']:>10.2f}"
+            f"{latency['p99']:>10.2f}{result['queries_per_request']:>8.2f}{str(result.get('oversell', '-')):>10}"
+        )
+    print(f"written to {args.output}")
+
+if __name__ == "__main__":
+    main()
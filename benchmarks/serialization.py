@@ -0,0 +1,122 @@
+"""Rows per second of the list endpoints' serialization, before and after the fast path.
+
+"before" is what FastAPI does with a ``response_model``: load ORM objects,
+validate them into the schema with ``from_attributes``, dump to JSON-ready
+data and encode with the stdlib ``json``. "after" selects plain column rows
+and encodes them with orjson (``app.serialization``).
+
+Runs against a throwaway SQLite file:
+
+    python -m benchmarks.serialization --rows 5000 --repeat 5
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+_db_dir = tempfile.mkdtemp(prefix="bench_serialization_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_db_dir}/bench.db")
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session, joinedload
+
+from app import models, schemas
+from app.database import Base
+from app.serialization import as_dicts
+from app.services.booking_service import (
+    BOOKING_COLUMNS, BOOKING_MOVIE_COLUMNS, BOOKING_SHOWTIME_COLUMNS, _booking_with_details
+)
+from app.services.showtime_service import SHOWTIME_COLUMNS
+
+def seed(session: Session, rows: int):
+    now = datetime.now(timezone.utc)
+    session.execute(insert(models.User), [{
+        "username": "bench", "email": "bench@example.com", "full_name": "Bench", "hashed_password": "x"
+    }])
+    session.execute(insert(models.Auditorium), [{"name": "Bench Hall", "total_seats": 500}])
+    session.execute(insert(models.Movie), [
+        {"title": f"Movie {i}", "description": "A film", "duration": 120, "genre": "Drama"}
+        for i in range(100)
+    ])
+    session.execute(insert(models.Showtime), [
+        {
+            "movie_id": i % 100 + 1,
+            "auditorium_id": 1,
+            "start_time": now + timedelta(hours=3 * i),
+            "end_time": now + timedelta(hours=3 * i + 2),
+            "total_seats": 500,
+            "available_seats": 480,
+        }
+        for i in range(rows)
+    ])
+    session.execute(insert(models.Booking), [
+        {"user_id": 1, "showtime_id": i + 1, "seats": 2, "seat_numbers": [4, 5], "status": "completed"}
+        for i in range(rows)
+    ])
+    session.commit()
+
+def fastapi_encode(adapter: TypeAdapter, objects) -> bytes:
+    content = adapter.dump_python(adapter.validate_python(objects, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+def orjson_encode(rows) -> bytes:
+    return orjson.dumps(rows, option=orjson.OPT_UTC_Z)
+
+def showtimes_before(session: Session) -> bytes:
+    showtimes = session.scalars(select(models.Showtime)).all()
+    return fastapi_encode(TypeAdapter(List[schemas.Showtime]), showtimes)
+
+def showtimes_after(session: Session) -> bytes:
+    return orjson_encode(as_dicts(session.execute(select(*SHOWTIME_COLUMNS))))
+
+def bookings_before(session: Session) -> bytes:
+    bookings = session.scalars(
+        select(models.Booking).options(joinedload(models.Booking.showtime).joinedload(models.Showtime.movie))
+    ).all()
+    return fastapi_encode(TypeAdapter(List[schemas.BookingWithDetails]), bookings)
+
+def bookings_after(session: Session) -> bytes:
+    rows = session.execute(
+        select(*BOOKING_COLUMNS, *BOOKING_SHOWTIME_COLUMNS, *BOOKING_MOVIE_COLUMNS)
+        .join(models.Showtime, models.Booking.showtime_id == models.Showtime.id)
+        .join(models.Movie, models.Showtime.movie_id == models.Movie.id)
+    ).mappings().all()
+    return orjson_encode([_booking_with_details(row) for row in rows])
+
+def measure(engine, encode, rows: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        # A fresh session each round so the ORM path pays for hydration every time
+        with Session(engine) as session:
+            started = time.perf_counter()
+            encode(session)
+            best = min(best, time.perf_counter() - started)
+    return rows / best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    engine = create_engine(f"sqlite:///{_db_dir}/bench.db")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        seed(session, args.rows)
+    
+    print(f"{'endpoint':<22}{'before rows/s':>15}{'after rows/s':>15}{'speedup':>10}")
+    for name, before, after in (
+        ("GET /showtimes", showtimes_before, showtimes_after),
+        ("GET /bookings", bookings_before, bookings_after),
+    ):
+        slow = measure(engine, before, args.rows, args.repeat)
+        fast = measure(engine, after, args.rows, args.repeat)
+        print(f"{name:<22}{slow:>15,.0f}{fast:>15,.0f}{fast / slow:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,7 @@ const state = {
   function logout() { 
     state.token = ''; 
     localStorage.removeItem('access_token'); 
+    watchAvailability([]);
     updateAuthUI(); 
     toast('Logged out.'); 
   }
@@ -236,10 +237,11 @@ const state = {
         tr.innerHTML = `
           <td>${s.id}</td>
           <td>${s.movie_id}</td>
+          <td>${s.auditorium_id}</td>
           <td>${fmtDate(s.start_time)}</td>
           <td>${fmtDate(s.end_time)}</td>
           <td>${s.total_seats}</td>
-          <td>${s.available_seats}</td>
+          <td id="st_seats_${s.id}">${s.available_seats}</td>
           <td>${s.is_active ? '✅' : '❌'}</td>
           <td>
             <button class="btn" onclick='prefillShowtime(${JSON.stringify(s)})'>Edit</button>
@@ -250,14 +252,42 @@ const state = {
       });
       
       document.getElementById('st_out').textContent = 'Loaded ' + data.length + ' showtimes.';
+      watchAvailability(data.map(s => s.id));
     } catch (e) { 
       document.getElementById('st_out').textContent = 'Error: ' + e.message; 
     }
   }
 
+  // ====== LIVE AVAILABILITY ======
+  // Seat counts are pushed by the server as they change instead of re-polling
+  let availabilitySource = null;
+
+  function watchAvailability(showtimeIds) {
+    if (availabilitySource) { 
+      availabilitySource.close(); 
+      availabilitySource = null; 
+    }
+    
+    if (!state.token || !showtimeIds.length) return;
+    
+    // EventSource cannot send headers, so the token goes in the query string
+    const params = new URLSearchParams({ token: state.token });
+    showtimeIds.slice(0, 100).forEach(id => params.append('showtime_ids', id));
+    
+    availabilitySource = new EventSource(
+      state.baseUrl.replace(/\/$/, '') + '/api/v1/showtimes/availability/stream?' + params
+    );
+    availabilitySource.addEventListener('availability', e => {
+      const { showtime_id, available_seats } = JSON.parse(e.data);
+      const cell = document.getElementById('st_seats_' + showtime_id);
+      if (cell) cell.textContent = available_seats;
+    });
+  }
+
   function prefillShowtime(s) {
     document.getElementById('st_id').value = s.id;
     document.getElementById('st_movie_id').value = s.movie_id;
+    document.getElementById('st_auditorium_id').value = s.auditorium_id;
     document.getElementById('st_start').value = toLocalInputValue(s.start_time);
     document.getElementById('st_total').value = s.total_seats;
   }
@@ -314,6 +344,7 @@ const state = {
   function readShowtimeForm() {
     return {
       movie_id: Number(document.getElementById('st_movie_id').value),
+      auditorium_id: Number(document.getElementById('st_auditorium_id').value),
       start_time: new Date(document.getElementById('st_start').value).toISOString(),
       total_seats: Number(document.getElementById('st_total').value)
     };
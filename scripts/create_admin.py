@@ -1,7 +1,8 @@
+import asyncio
 from sqlalchemy.orm import Session
 from app import models
-from app.auth import get_password_hash
 from app.database import SessionLocal
+from app.passwords import password_hasher
 
 
 def create_admin():
@@ -11,7 +12,7 @@ def create_admin():
         username="admin",
         email="admin@gmail.com",
         full_name="admin",
-        hashed_password=get_password_hash(plain_password),
+        hashed_password=asyncio.run(password_hasher.hash(plain_password)),
         is_active=True,
         is_admin=True 
     )
@@ -21,6 +22,7 @@ def create_admin():
     print(f"Admin created successfully!")
     print(f"Username: {admin_user.username}")
     print(f"Password: {plain_password}")
+    password_hasher.shutdown()
 
 if __name__ == "__main__":
     create_admin()
\ No newline at end of file
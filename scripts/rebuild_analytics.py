@@ -0,0 +1,13 @@
+import asyncio
+from app.database import AsyncSessionLocal, async_engine
+from app.services.analytics_service import rebuild_sales_summary
+
+
+async def rebuild_analytics():
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_sales_summary(db)
+    await async_engine.dispose()
+    print(f"Sales summary rebuilt: {rows} movie-day rows")
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_analytics())